@@ -0,0 +1,106 @@
+"""Run the messager end to end with headless Chrome against a local stand-in.
+
+Run from the project root with `python -m benchmarks.e2e_benchmark` and
+optionally pass the number of students to message in each scenario (default
+30) and `--backend cdp` to drive Chrome over the DevTools Protocol instead of
+chromedriver. Needs Chrome, and chromedriver for the Selenium backend, but
+no Handshake account. Each scenario starts a fresh stand-in server with
+different faults and reports the messages it received per minute and the
+p95 time from opening a student's page to their message arriving.
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.handshake_server import HandshakeServer
+from benchmarks.roster_memory_benchmark import write_csv
+from src.config import DEFAULT_CONFIG
+
+STUDENTS = 30
+MESSAGE = "Hi {first_name},\n\nCome meet {advisor} at the career fair!\n"
+
+# Name and stand-in server faults of each scenario
+SCENARIOS = [
+    ("baseline", {}),
+    ("200ms latency", {"latency": 0.2}),
+    ("slow modal", {"modal_delay": 2}),
+    ("10% dropped sends", {"drop_rate": 0.1}),
+    ("session expiry", {"expire_after": 10}),
+]
+
+
+def write_files(server: HandshakeServer, rows: int, backend: str):
+    write_csv("students.csv", rows)
+    with open("message.txt", "w") as f:
+        f.write(MESSAGE)
+    with open(".env", "w") as f:
+        f.write("")
+    with open("config.json", "w") as f:
+        json.dump({
+            **DEFAULT_CONFIG,
+            "handshake_url": f"{server.url}/edu",
+            "max_time": "30m",
+            "min_delay": 0,
+            "random_delay": 0,
+            # Short enough that a logged out page is noticed quickly
+            "max_timeout": 10,
+            "max_retries": 2,
+            "retry_backoff": 1,
+            "chromedriver_path": ".",
+            "chrome_data_dir": os.path.abspath("profile"),
+            "standby_webdriver": False,
+            "backend": backend,
+        }, f)
+
+
+def run_scenario(faults: dict, rows: int, backend: str):
+    from src.messager import Messager
+    cwd = os.getcwd()
+    with HandshakeServer(**faults) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_files(server, rows, backend)
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, \
+                    contextlib.redirect_stdout(devnull):
+                messager = Messager()
+                messager.run()
+            seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        return messager, server, seconds
+
+
+def report(name: str, messager, server: HandshakeServer, seconds: float):
+    delivered = len(server.sent)
+    times = sorted(server.send_times)
+    p95 = times[int(len(times) * 0.95)] if len(times) > 0 else 0
+    print(f"  {name:<20} {delivered / seconds * 60:7.1f} msg/min   "
+          f"p95 {p95:5.2f}s   {messager.messages_sent:3} sent   "
+          f"{delivered:3} delivered   {server.dropped:3} dropped   "
+          f"{messager.messages_failed:3} failed   "
+          f"stopped: {messager.get_stop_cause()}")
+
+
+def main():
+    args = sys.argv[1:]
+    backend = "selenium"
+    if "--backend" in args:
+        index = args.index("--backend")
+        backend = args[index + 1]
+        del args[index:index + 2]
+    rows = int(args[0]) if len(args) > 0 else STUDENTS
+    logging.disable(logging.WARNING)
+    print(f"{rows} students per scenario on the {backend} backend")
+    for name, faults in SCENARIOS:
+        messager, server, seconds = run_scenario(faults, rows, backend)
+        report(name, messager, server, seconds)
+
+
+if __name__ == "__main__":
+    main()
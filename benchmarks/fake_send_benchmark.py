@@ -0,0 +1,86 @@
+"""Measure the messager's own overhead by sending with the fake backend.
+
+Run from the project root with `python -m benchmarks.fake_send_benchmark`
+and optionally pass the number of students to generate (default 5000).
+Pass `--profile` to also print the functions the run spent the most time
+in. Runs a full Messager in a temporary directory with `min_delay` at 0, so
+everything measured is reading the csv, rendering the message, pacing,
+stats and logging.
+"""
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+from benchmarks.roster_memory_benchmark import write_csv
+from src.config import DEFAULT_CONFIG
+
+STUDENTS = 5000
+MESSAGE = "Hi {first_name},\n\nCome meet {advisor} about {major} at the " \
+    "career fair!\n"
+
+
+def write_files(rows: int):
+    write_csv("students.csv", rows)
+    with open("message.txt", "w") as f:
+        f.write(MESSAGE)
+    with open(".env", "w") as f:
+        f.write("")
+    # Checked to exist even though the fake backend never starts chromedriver
+    os.makedirs(DEFAULT_CONFIG["chromedriver_path"])
+    with open("config.json", "w") as f:
+        json.dump({
+            **DEFAULT_CONFIG,
+            "max_time": "24h",
+            "min_delay": 0,
+            "random_delay": 0,
+            "backend": "fake",
+        }, f)
+
+
+def send_all():
+    from src.messager import Messager
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        messager = Messager()
+        messager.run()
+    return messager
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--profile"]
+    profile = "--profile" in sys.argv
+    rows = int(args[0]) if len(args) > 0 else STUDENTS
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_files(rows)
+            # Logs at the same level main.py does, since logging is part of
+            # the overhead being measured
+            logging.basicConfig(filename="messager.log", level=logging.DEBUG,
+                                encoding="utf-8")
+            profiler = cProfile.Profile() if profile else None
+            start = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            messager = send_all()
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            logging.shutdown()
+        finally:
+            os.chdir(cwd)
+    print(f"{messager.messages_sent} of {rows} students in {seconds:.2f}s "
+          f"({messager.messages_sent / seconds:.0f} sends/s)")
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
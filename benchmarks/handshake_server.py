@@ -0,0 +1,262 @@
+"""A local stand-in for Handshake to develop and benchmark against offline.
+
+Serves student profile pages with the elements the messager depends on: the
+`send-message` link, and a message window with `modal-title`,
+`message-modal-subject`, a message box and the `createConversation` send
+button. Sending posts the message to `/edu/messages` as JSON, the way
+`http_send` does, and only requests with the session cookie and the page's
+csrf token succeed.
+
+Faults can be injected to test how the messager copes: slow responses, a
+message window that takes a while to open, sends the server accepts but
+drops, and a session that expires after a number of messages.
+"""
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+
+SESSION_COOKIE = "_handshake_session"
+
+PROFILE_PATH = re.compile(r"^/edu/users/(\d+)(/send-message)?/?$")
+
+PROFILE_PAGE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta name="csrf-token" content="$csrf_token">
+<title>Student $student_id</title>
+</head>
+<body>
+<h1>Student $student_id</h1>
+<a id="message-button" href="/edu/users/$student_id/send-message">Message</a>
+<div id="message-modal" role="dialog" hidden>
+  <h2 id="modal-title">New Message</h2>
+  <input id="message-modal-subject" type="text" value="">
+  <textarea id="message-modal-body"></textarea>
+  <a href="#" data-bind="click: createConversation">Send</a>
+</div>
+<script>
+const modal = document.getElementById("message-modal");
+const openModal = () => setTimeout(() => { modal.hidden = false; },
+                                   $modal_delay);
+document.getElementById("message-button").addEventListener(
+    "click", (event) => {
+        event.preventDefault();
+        openModal();
+    });
+document.querySelector("[data-bind='click: createConversation']")
+    .addEventListener("click", (event) => {
+        event.preventDefault();
+        // keepalive lets the request finish if the next student's page is
+        // opened straight away
+        fetch("/edu/messages", {
+            method: "POST",
+            keepalive: true,
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRF-Token": "$csrf_token"
+            },
+            body: JSON.stringify({
+                recipient_id: $student_id,
+                subject: document.getElementById(
+                    "message-modal-subject").value,
+                body: document.getElementById("message-modal-body").value
+            })
+        });
+        modal.hidden = true;
+    });
+if ($open_modal) {
+    openModal();
+}
+</script>
+</body>
+</html>
+""")
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Log in</title></head>
+<body><h1>Log in to Handshake</h1></body></html>
+"""
+
+
+class HandshakeServer:
+    def __init__(self, latency: float = 0, fail_rate: float = 0,
+                 modal_delay: float = 0, drop_rate: float = 0,
+                 expire_after: int | None = None):
+        # Seconds every page and message request takes to answer
+        self.latency = latency
+        # Share of message requests answered with a server error
+        self.fail_rate = fail_rate
+        # Seconds the message window takes to open
+        self.modal_delay = modal_delay
+        # Share of message requests answered as sent but never delivered
+        self.drop_rate = drop_rate
+        # Messages delivered before the session expires and every page
+        # redirects to the login page
+        self.expire_after = expire_after
+        self.session = secrets.token_hex(16)
+        self.csrf_token = secrets.token_hex(16)
+        self.lock = threading.Lock()
+        self.sent = []
+        self.dropped = 0
+        # Seconds from opening each student's page to their message arriving
+        self.send_times = []
+        self.page_opened = {}
+        self.connections = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), HandshakeHandler)
+        self.server.daemon_threads = True
+        self.server.handshake = self
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def expired(self) -> bool:
+        return self.expire_after is not None and \
+            len(self.sent) >= self.expire_after
+
+    # Cookies a browser logged in to the stand-in would have
+    def get_cookies(self) -> list[dict]:
+        return [{"name": SESSION_COOKIE, "value": self.session}]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class HandshakeHandler(BaseHTTPRequestHandler):
+    # Keeps connections open between requests like Handshake does
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which Nagle's algorithm would
+    # hold back until the client acknowledges the headers
+    disable_nagle_algorithm = True
+
+    @property
+    def handshake(self) -> HandshakeServer:
+        return self.server.handshake
+
+    def setup(self):
+        super().setup()
+        with self.handshake.lock:
+            self.handshake.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def logged_in(self) -> bool:
+        if self.handshake.expired:
+            return False
+        cookie = self.headers.get("Cookie", "")
+        return f"{SESSION_COOKIE}={self.handshake.session}" in cookie
+
+    def respond(self, status: int, body: str, content_type: str,
+                headers: dict[str, str] | None = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect_to_login(self):
+        self.send_response(302)
+        self.send_header("Location", "/login")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        time.sleep(self.handshake.latency)
+        if self.path == "/login":
+            self.respond(200, LOGIN_PAGE, "text/html")
+            return
+        if not self.path.startswith("/edu"):
+            self.respond(404, "Not found", "text/plain")
+            return
+        if self.handshake.expired:
+            self.redirect_to_login()
+            return
+        # Browsers are logged in on their first visit, so a fresh Chrome
+        # profile can be used without a login step
+        headers = {}
+        if not self.logged_in():
+            headers["Set-Cookie"] = \
+                f"{SESSION_COOKIE}={self.handshake.session}; Path=/"
+
+        profile = PROFILE_PATH.match(self.path)
+        if profile is None:
+            self.respond(
+                200,
+                f'<html><head><meta name="csrf-token" '
+                f'content="{self.handshake.csrf_token}"></head>'
+                f'<body></body></html>',
+                "text/html",
+                headers
+            )
+            return
+        student_id = int(profile.group(1))
+        with self.handshake.lock:
+            self.handshake.page_opened[student_id] = time.monotonic()
+        self.respond(
+            200,
+            PROFILE_PAGE.substitute(
+                csrf_token=self.handshake.csrf_token,
+                student_id=student_id,
+                modal_delay=int(self.handshake.modal_delay * 1000),
+                open_modal="true" if profile.group(2) else "false"
+            ),
+            "text/html",
+            headers
+        )
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/edu/messages":
+            self.respond(404, "Not found", "text/plain")
+            return
+        if not self.logged_in():
+            self.respond(401, '{"error": "unauthorized"}', "application/json")
+            return
+        if self.headers.get("X-CSRF-Token") != self.handshake.csrf_token:
+            self.respond(422, '{"error": "invalid csrf token"}',
+                         "application/json")
+            return
+        time.sleep(self.handshake.latency)
+        if random.random() < self.handshake.fail_rate:
+            self.respond(500, '{"error": "server error"}',
+                         "application/json")
+            return
+        conversation = json.loads(body)
+        with self.handshake.lock:
+            if random.random() < self.handshake.drop_rate:
+                self.handshake.dropped += 1
+                conversation_id = 0
+            else:
+                self.handshake.sent.append(conversation)
+                conversation_id = len(self.handshake.sent)
+                opened = self.handshake.page_opened.pop(
+                    conversation.get("recipient_id"), None)
+                if opened is not None:
+                    self.handshake.send_times.append(
+                        time.monotonic() - opened)
+        self.respond(201, json.dumps({"id": conversation_id}),
+                     "application/json")
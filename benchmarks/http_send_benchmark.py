@@ -0,0 +1,81 @@
+"""Send messages over http to a local Handshake stand-in.
+
+Run from the project root with `python -m benchmarks.http_send_benchmark`
+and optionally pass the number of messages to send (default 500). Compares
+sending over kept alive connections with opening a connection per message,
+and checks that failed sends raise HttpSendError so the messager can fall
+back to the browser.
+"""
+import logging
+import sys
+import time
+
+from benchmarks.handshake_server import HandshakeServer
+from src.config import Config
+from src.http_send import HttpSendError, HttpSender
+
+MESSAGES = 500
+
+
+def create_config(server: HandshakeServer) -> Config:
+    config = Config()
+    config.handshake_url = f"{server.url}/edu"
+    config.http_send_url = "{handshake_url}/messages"
+    config.pool_size = 1
+    config.max_timeout = 5
+    return config
+
+
+def send_all(sender: HttpSender, server: HandshakeServer, messages: int,
+             keep_alive: bool = True):
+    times = []
+    fallbacks = 0
+    for student_id in range(1, messages + 1):
+        start = time.perf_counter()
+        try:
+            sender.send(student_id, "Subject", "Hello there",
+                        server.get_cookies)
+        except HttpSendError:
+            fallbacks += 1
+        times.append(time.perf_counter() - start)
+        if not keep_alive:
+            sender.http.clear()
+    return times, fallbacks
+
+
+def report(name: str, server: HandshakeServer, times: list[float],
+           fallbacks: int):
+    times = sorted(times)
+    p50 = times[len(times) // 2] * 1000
+    p95 = times[int(len(times) * 0.95)] * 1000
+    print(f"  {name:<20} {len(times) / sum(times):8.0f} msg/s   "
+          f"p50 {p50:6.2f} ms   p95 {p95:6.2f} ms   "
+          f"{server.connections:4} connections   {fallbacks:3} fallbacks")
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGES
+    logging.disable(logging.WARNING)
+    print(f"{messages} messages")
+    for name, keep_alive, fail_rate in (
+        ("keep alive", True, 0),
+        ("connection per send", False, 0),
+        ("10% server errors", True, 0.1),
+    ):
+        with HandshakeServer(fail_rate=fail_rate) as server:
+            sender = HttpSender(create_config(server))
+            # Consecutive errors would otherwise turn http sends off, which
+            # is what the messager wants but not what this measures
+            sender.failures = -messages
+            times, fallbacks = send_all(sender, server, messages, keep_alive)
+            report(name, server, times, fallbacks)
+            sent = len(server.sent)
+            if sent + fallbacks != messages:
+                print(f"Sent {sent} and fell back {fallbacks} times for "
+                      f"{messages} messages")
+                sys.exit(1)
+            sender.close()
+
+
+if __name__ == "__main__":
+    main()
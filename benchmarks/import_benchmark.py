@@ -0,0 +1,85 @@
+"""Measure how long the project's entry points take to import.
+
+Run from the project root with `python -m benchmarks.import_benchmark` and
+optionally pass the number of runs to take the fastest of (default 5). Uses
+`python -X importtime`, and exits with an error if printing stats imports
+any of the heavy modules it should not need.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RUNS = 5
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["src.utils", "src.config", "src.messager"]
+
+# Modules that printing stats has no use for
+STATS_FORBIDDEN = [
+    "selenium", "pandas", "dotenv", "websockets", "psutil", "src.config"
+]
+
+
+# Returns {module: cumulative import time in seconds} for one run. Modules
+# imported by other modules are indented by how deep they were imported
+def import_times(args: list[str], cwd: str) -> dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line.split("|")
+            times[name[1:]] = int(cumulative) / 1e6
+        except ValueError:
+            # The header line
+            continue
+    return times
+
+
+def fastest(runs: int, args: list[str], cwd: str) -> dict[str, float]:
+    best = {}
+    for _ in range(runs):
+        for name, seconds in import_times(args, cwd).items():
+            best[name] = min(best.get(name, seconds), seconds)
+    return best
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    for module in MODULES:
+        seconds = fastest(runs, ["-c", f"import {module}"], ROOT)[module]
+        print(f"  import {module:<28} {seconds * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "config.json"), "w") as f:
+            json.dump({"max_time": "1h", "max_messages": -1}, f)
+        times = fastest(runs, [os.path.join(ROOT, "stats.py")], tmp)
+    total = sum(
+        seconds for name, seconds in times.items()
+        if not name.startswith(" ")
+    )
+    print(f"  {'stats.py imports':<35} {total * 1000:8.1f} ms")
+
+    imported = {name.strip() for name in times}
+    forbidden = [
+        module for module in STATS_FORBIDDEN
+        if any(name == module or name.startswith(f"{module}.")
+               for name in imported)
+    ]
+    if len(forbidden) > 0:
+        print(f"stats.py imported {', '.join(forbidden)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compare the memory used by per-row dict students and the columnar roster.
+
+Run from the project root with `python -m benchmarks.roster_memory_benchmark`
+and optionally pass the number of rows to generate (default 500000).
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.roster import Roster
+
+ROWS = 500_000
+COLUMNS = [
+    "handshake_id", "first_name", "last_name", "email", "school_year",
+    "major", "college", "gpa", "graduation_date", "campus", "event",
+    "advisor"
+]
+
+
+# The Student layout the columnar roster replaced: one dict per row
+class LegacyStudent:
+    def __init__(self, student_id, data):
+        self.student_id = student_id
+        self.data = data
+
+
+def write_csv(path: str, rows: int):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                10000000 + i, f"First{i}", f"Last{i}",
+                f"student{i}@ohio.edu", "Senior", "Computer Science",
+                "Engineering", f"{2 + i % 200 / 100:.2f}", "2025-05-01",
+                "Athens", "Career Fair", f"Advisor{i % 50}"
+            ])
+
+
+def verify_student_id(student_id, row_index):
+    return int(student_id)
+
+
+def load_legacy(path: str):
+    with open(path, newline="") as f:
+        return [
+            LegacyStudent(verify_student_id(row["handshake_id"], i), row)
+            for i, row in enumerate(csv.DictReader(f))
+        ]
+
+
+def load_columnar(path: str):
+    roster = Roster(path, verify_student_id)
+    students = []
+    while roster.has_row(len(students)):
+        students.append(roster.get(len(students)))
+    return students
+
+
+def stream(path: str):
+    roster = Roster(path, verify_student_id)
+    row = 0
+    while roster.has_row(row):
+        roster.get(row)
+        row += 1
+    return row
+
+
+def measure(name: str, load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<34} held {current / 2**20:8.1f} MiB  "
+          f"peak {peak / 2**20:8.1f} MiB  {elapsed:6.2f}s")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "students.csv")
+        write_csv(path, rows)
+        print(f"{rows} rows x {len(COLUMNS)} columns "
+              f"({os.path.getsize(path) / 2**20:.1f} MiB csv)")
+        legacy = measure("per-row dict students",
+                         lambda: load_legacy(path))
+        del legacy
+        columnar = measure("columnar roster, all rows held",
+                           lambda: load_columnar(path))
+        del columnar
+        measure("columnar roster, streamed", lambda: stream(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Microbenchmarks for the parts of a run that do not touch the browser.
+
+Run from the project root with `python -m benchmarks.suite`. Each benchmark
+is timed like timeit: called enough times to take a fifth of a second, and
+the fastest of 3 rounds is kept. Times are compared with the baseline in
+`benchmarks/baselines.json`, and the suite exits with an error if any
+benchmark got more than `--tolerance` (default 0.25, 25%) slower.
+
+Pass `--save` to record the times as the new baseline, `--quick` to skip
+the 1,000,000 row csv, and any other argument to only run the benchmarks
+whose names contain it. Baselines only mean something on the machine they
+were saved on, so save one before comparing on a new machine.
+"""
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from types import SimpleNamespace
+
+from benchmarks.roster_memory_benchmark import COLUMNS, verify_student_id, \
+    write_csv
+from src.config import DEFAULT_CONFIG, Config
+from src.histogram import new_histogram, record_histogram
+from src.messager import Messager
+from src.roster import Roster
+from src.template import MessageTemplate
+from src.utils import get_stats, get_stats_message, new_stats_sections, \
+    update_stats, write_stats_file
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+TOLERANCE = 0.25
+ROUNDS = 3
+
+ROSTER_SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+# Message templates by number of variables, each between text like a real
+# message's
+TEMPLATE_SIZES = {"small": 2, "medium": 20, "large": 200}
+STUDENTS = 1000
+
+
+def make_template(variables: int) -> str:
+    columns = COLUMNS[1:]
+    return "".join(
+        f"Paragraph {i} of the message, with a value: "
+        f"{{{columns[i % len(columns)]}}}.\n"
+        for i in range(variables)
+    )
+
+
+def bench_parse_message(path: str, variables: int):
+    text = make_template(variables)
+    messager = Messager.__new__(Messager)
+    messager.config = SimpleNamespace(message_template=MessageTemplate(text))
+    roster = Roster(path, verify_student_id)
+    students = [roster.get(row) for row in range(STUDENTS)]
+    roster.close()
+    return lambda: [
+        messager.parse_message(student, text) for student in students
+    ]
+
+
+def bench_roster_load(path: str):
+    config = Config()
+    config.student_csv_file = path
+
+    def load():
+        config.load_students()
+        row = 0
+        while config.students.has_row(row):
+            config.students.get(row)
+            row += 1
+        config.students.close()
+    return load
+
+
+def bench_verify_student_id():
+    config = Config()
+    config.student_csv_file = "students.csv"
+    ids = [
+        "10000001", 10000002, " 10000003 ", "-10000004", "abc", None, "",
+        "123456789012"
+    ] * (STUDENTS // 8)
+    return lambda: [
+        config.verify_student_id(student_id, row)
+        for row, student_id in enumerate(ids)
+    ]
+
+
+def bench_stats_round_trip():
+    path = "round_trip_stats.json"
+
+    def round_trip():
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            update_stats(3600.0, 500, 5, 20, 1800.0, 120.0, 505, path)
+            get_stats(path)
+    return round_trip
+
+
+def bench_stats_message():
+    path = "report_stats.json"
+    sections = new_stats_sections()
+    for section in ("phases", "waits", "page_loads"):
+        for name in ("page_load", "modal", "send"):
+            histogram = sections[section].setdefault(name, new_histogram())
+            for i in range(STUDENTS):
+                record_histogram(histogram, 0.1 + i / STUDENTS)
+    write_stats_file({
+        "time_running": 3600.0,
+        "messages_sent": 500,
+        "messages_failed": 5,
+        "times_failed": 20,
+        "time_sending": 1800.0,
+        "time_retrying": 120.0,
+        "current_position": 505,
+        **sections,
+    }, path)
+    return lambda: get_stats_message(path)
+
+
+def get_benchmarks(quick: bool):
+    benchmarks = {}
+    for size, variables in TEMPLATE_SIZES.items():
+        benchmarks[f"parse_message[{size}]"] = \
+            lambda variables=variables: bench_parse_message(
+                "roster_1k.csv", variables)
+    for size, rows in ROSTER_SIZES.items():
+        if quick and rows > 100_000:
+            continue
+        benchmarks[f"roster_load[{size}]"] = \
+            lambda size=size: bench_roster_load(f"roster_{size}.csv")
+    benchmarks["verify_student_id"] = bench_verify_student_id
+    benchmarks["stats_round_trip"] = bench_stats_round_trip
+    benchmarks["stats_message"] = bench_stats_message
+    return benchmarks
+
+
+def write_files(quick: bool):
+    for size, rows in ROSTER_SIZES.items():
+        if quick and rows > 100_000:
+            continue
+        write_csv(f"roster_{size}.csv", rows)
+    with open("config.json", "w") as f:
+        json.dump(DEFAULT_CONFIG, f)
+
+
+# Seconds per call of the fastest round
+def measure(func) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(number, 1)
+    return min(timer.repeat(ROUNDS, number)) / number
+
+
+def load_baseline() -> dict[str, float]:
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(results: dict[str, float]):
+    with open(BASELINE_FILE, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, f, indent=4)
+        f.write("\n")
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.1f} ms"
+    return f"{seconds:8.2f} s "
+
+
+def main():
+    args = sys.argv[1:]
+    save = "--save" in args
+    quick = "--quick" in args
+    tolerance = TOLERANCE
+    if "--tolerance" in args:
+        index = args.index("--tolerance")
+        tolerance = float(args[index + 1])
+        del args[index:index + 2]
+    filters = [arg for arg in args if not arg.startswith("--")]
+
+    logging.disable(logging.WARNING)
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_files(quick)
+            for name, setup in get_benchmarks(quick).items():
+                if filters and not any(part in name for part in filters):
+                    continue
+                seconds = measure(setup())
+                results[name] = seconds
+                line = f"  {name:<24} {format_time(seconds)}"
+                if name in baseline:
+                    change = seconds / baseline[name] - 1
+                    line += f"   {change:+7.1%} vs " \
+                        f"{format_time(baseline[name])}"
+                    if change > tolerance:
+                        line += "   REGRESSED"
+                        regressions.append(name)
+                print(line)
+        finally:
+            os.chdir(cwd)
+
+    if save:
+        save_baseline({**baseline, **results})
+        print(f"Saved baseline to {BASELINE_FILE}")
+    elif len(regressions) > 0:
+        print(f"{len(regressions)} benchmarks more than {tolerance:.0%} "
+              f"slower than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
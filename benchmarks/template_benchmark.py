@@ -0,0 +1,88 @@
+"""Compare per-student message parsing with the compiled MessageTemplate.
+
+Run from the project root with `python -m benchmarks.template_benchmark`.
+"""
+import logging
+import time
+
+from src.template import MessageTemplate
+from src.types.student import Student
+
+ROWS = 100_000
+MESSAGE = (
+    "Hi {first_name},\n\n"
+    "Career Services at {school} is hosting a {event} on {date}. "
+    "Employers from {industry} will be there and are looking for "
+    "{major} students like you.\n\n"
+    "Sign up on Handshake before {deadline}! \\{Reply STOP to opt out\\}\n"
+)
+
+
+# The per-student parser MessageTemplate replaced, kept for comparison
+def legacy_parse_message(student: Student, message: str):
+    escaped_message = message.replace("\\{", "")
+    escaped_message = escaped_message.replace("\\}", "")
+    split_variables = escaped_message.split('{')
+
+    if len(split_variables) == 1:
+        return message
+
+    variable_message = ""
+    for i in range(0, len(split_variables)):
+        if "}" in split_variables[i]:
+            split_variable = split_variables[i].split("}")
+            student_data = student.get_student_data(split_variable[0])
+            if student_data is not None:
+                logging.debug(
+                    f"Replacing [{split_variable[0]}] with "
+                    f"\"{student_data}\"")
+                variable_message += student_data
+                variable_message += split_variable[1]
+            else:
+                variable_message += split_variable[1]
+        else:
+            variable_message += split_variables[i]
+    return variable_message
+
+
+def make_students(rows: int) -> list[Student]:
+    columns = {
+        "handshake_id": tuple(str(i) for i in range(rows)),
+        "first_name": tuple(f"Student{i}" for i in range(rows)),
+        "school": ("Ohio University",) * rows,
+        "event": ("Career Fair",) * rows,
+        "date": ("March 3rd",) * rows,
+        "industry": ("Engineering",) * rows,
+        "major": ("Computer Science",) * rows,
+        "deadline": ("March 1st",) * rows,
+    }
+    return [
+        Student(student_id=i, columns=columns, row=i) for i in range(rows)
+    ]
+
+
+def main():
+    students = make_students(ROWS)
+
+    start = time.perf_counter()
+    legacy = [legacy_parse_message(student, MESSAGE) for student in students]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    template = MessageTemplate(MESSAGE)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rendered = template.render_all(students)
+    render_time = time.perf_counter() - start
+
+    assert len(legacy) == len(rendered)
+    print(f"Rendered {ROWS} messages ({len(MESSAGE)} characters each)")
+    print(f"  parse_message per student: {legacy_time:.3f}s")
+    print(f"  MessageTemplate compile:   {compile_time * 1000:.3f}ms")
+    print(f"  MessageTemplate.render_all: {render_time:.3f}s "
+          f"({legacy_time / render_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Compare validating the students csv row by row and column by column.
+
+Run from the project root with `python -m benchmarks.validation_benchmark`
+and optionally pass the number of rows to generate (default 100000).
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Imported up front so the vectorized time does not include loading pandas
+import pandas  # noqa: F401
+
+from benchmarks.roster_memory_benchmark import COLUMNS, write_csv
+from src.config import Config
+from src.roster import Roster
+from src.validation import validate_roster
+
+ROWS = 100_000
+VARIABLES = ["first_name", "major", "advisor"]
+
+
+# The old check: every row built and verified one at a time
+def validate_rows(path: str):
+    config = Config()
+    config.student_csv_file = path
+    roster = Roster(path, config.verify_student_id)
+    seen = set()
+    row = 0
+    while roster.has_row(row):
+        student = roster.get(row)
+        seen.add(student.student_id)
+        for variable in VARIABLES:
+            student.data[variable].strip()
+        row += 1
+    return row
+
+
+def measure(name: str, validate):
+    start = time.perf_counter()
+    validate()
+    print(f"  {name:<24} {time.perf_counter() - start:6.2f}s")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "students.csv")
+        write_csv(path, rows)
+        print(f"{rows} rows x {len(COLUMNS)} columns")
+        measure("row by row", lambda: validate_rows(path))
+        measure("vectorized", lambda: validate_roster(path, VARIABLES))
+
+
+if __name__ == "__main__":
+    main()
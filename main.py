@@ -1,8 +1,9 @@
 from datetime import datetime as dt
+import argparse
 import logging
 import os
 
-from src.messager import Messager
+from src.utils import parse_shard
 
 
 logfile = f"logs/{dt.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
@@ -19,8 +20,11 @@ logging.info("Log started")
 
 
 class Driver:
-    def __init__(self):
-        self.messager = Messager()
+    def __init__(self, shard: str | None = None):
+        # Selenium takes a while to import, so only load it once logging is
+        # set up and the messager is actually needed
+        from src.messager import Messager
+        self.messager = Messager(shard=shard)
 
     def run(self):
         self.messager.run()
@@ -29,4 +33,19 @@ class Driver:
         pass
 
 
-Driver().run()
+parser = argparse.ArgumentParser(description="Message students on Handshake")
+parser.add_argument(
+    "--shard",
+    metavar="i/N",
+    help="only message the i-th of N shards of the students, so N computers "
+         "can split one csv between them"
+)
+args = parser.parse_args()
+if args.shard is not None:
+    try:
+        parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    logging.info(f"Running shard {args.shard}")
+
+Driver(shard=args.shard).run()
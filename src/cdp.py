@@ -0,0 +1,383 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+from src.config import CHROME_ARGS
+from src.scripts import FILL_AND_SEND_SCRIPT, WAIT_FOR_ELEMENT_SCRIPT, \
+    to_promise_expression
+from src.transport import Transport
+
+# Chrome writes the port and browser path of its DevTools endpoint here when
+# started with --remote-debugging-port=0
+ACTIVE_PORT_FILE = "DevToolsActivePort"
+
+CHROME_NAMES = [
+    "chrome",
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser"
+]
+WINDOWS_CHROME_PATH = os.path.join(
+    "%PROGRAMFILES%", "Google", "Chrome", "Application", "chrome.exe")
+MAC_CHROME_PATH = \
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+
+LOAD_EVENTS = {
+    "normal": "Page.loadEventFired",
+    "eager": "Page.domContentEventFired",
+    "none": None
+}
+
+CLICK_SCRIPT = """
+const [xpath, done] = arguments;
+const element = document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+if (element === null) {
+    done(false);
+} else {
+    element.scrollIntoView({block: "center"});
+    element.click();
+    done(true);
+}
+"""
+
+GET_ATTRIBUTE_SCRIPT = """
+const [xpath, name, done] = arguments;
+const element = document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+done(element === null ? null : element[name] ?? element.getAttribute(name));
+"""
+
+
+class CdpError(Exception):
+    pass
+
+
+class CdpTimeout(CdpError):
+    pass
+
+
+def find_chrome(chrome_path: str | None) -> str:
+    if chrome_path is not None:
+        return os.path.expandvars(chrome_path)
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path is not None:
+            return path
+    for path in (os.path.expandvars(WINDOWS_CHROME_PATH), MAC_CHROME_PATH):
+        if os.path.exists(path):
+            return path
+    raise CdpError("Could not find Chrome. Set chrome_path in config.json")
+
+
+class CdpBrowser:
+    """Chrome driven over the DevTools protocol from one asyncio event loop.
+
+    The event loop runs on its own thread. Tabs can be used from any thread
+    through their blocking methods, which schedule the work on that loop, so
+    tabs used by different pool workers send concurrently from a single
+    Chrome process without a chromedriver in between.
+    """
+
+    def __init__(self, config, chrome_data_dir: str):
+        self.config = config
+        self.chrome_data_dir = os.path.expandvars(chrome_data_dir)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever,
+            name="cdp-event-loop",
+            daemon=True
+        )
+        self.thread.start()
+        self.lock = threading.Lock()
+        # Counts relaunches, so workers whose tabs died with the same Chrome
+        # only relaunch it once
+        self.generation = 0
+        self.start()
+
+    def start(self):
+        self.process = self.launch()
+        self.connection = self.run(
+            CdpConnection.connect(self.get_websocket_url()))
+        logging.info("Chrome DevTools connection initialized")
+
+    def restart(self, generation: int):
+        """Relaunch Chrome after it died under a tab opened in `generation`.
+        Does nothing if Chrome was already relaunched since then.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            logging.warning("Relaunching Chrome...")
+            self.stop()
+            self.start()
+            self.generation += 1
+
+    def launch(self):
+        port_file = os.path.join(self.chrome_data_dir, ACTIVE_PORT_FILE)
+        if os.path.exists(port_file):
+            os.remove(port_file)
+        args = [
+            find_chrome(self.config.chrome_path),
+            f"--user-data-dir={self.chrome_data_dir}",
+            "--remote-debugging-port=0",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *[arg for arg in CHROME_ARGS if arg.startswith("--")],
+            "about:blank"
+        ]
+        logging.debug(f"Launching Chrome: {' '.join(args)}")
+        return subprocess.Popen(
+            args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def get_websocket_url(self):
+        port_file = os.path.join(self.chrome_data_dir, ACTIVE_PORT_FILE)
+        deadline = time.monotonic() + self.config.max_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CdpError(f"Chrome exited with code "
+                               f"{self.process.returncode}")
+            try:
+                with open(port_file) as f:
+                    lines = f.read().splitlines()
+                if len(lines) >= 2:
+                    return f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+            except FileNotFoundError:
+                pass
+            time.sleep(0.1)
+        raise CdpTimeout("Timed out waiting for Chrome to start")
+
+    # Runs a coroutine on the event loop and blocks until it finishes
+    def run(self, coroutine, timeout: float | None = None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise CdpTimeout("Timed out waiting for Chrome to respond")
+
+    def open_tab(self) -> "CdpTab":
+        return self.run(self.create_tab(), self.config.max_timeout)
+
+    async def create_tab(self):
+        target = await self.connection.send(
+            "Target.createTarget", {"url": "about:blank"})
+        session = await self.connection.send("Target.attachToTarget", {
+            "targetId": target["targetId"],
+            "flatten": True
+        })
+        tab = CdpTab(self, target["targetId"], session["sessionId"],
+                     self.generation)
+        await tab.send("Page.enable")
+        if len(self.config.blocked_urls) > 0:
+            await tab.send("Network.enable")
+            await tab.send("Network.setBlockedURLs", {
+                "urls": self.config.blocked_urls
+            })
+        logging.debug(f"Opened tab {target['targetId']}")
+        return tab
+
+    # Closes Chrome and its connection, even if Chrome already died
+    def stop(self):
+        try:
+            self.run(self.connection.send("Browser.close"), 5)
+        except CdpError as e:
+            logging.debug(f"Could not close Chrome cleanly\n{e}")
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        try:
+            self.run(self.connection.close(), 5)
+        except CdpError as e:
+            logging.debug(f"Could not close the connection cleanly\n{e}")
+
+    def close(self):
+        self.stop()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        logging.info("Chrome DevTools connection closed")
+
+
+class CdpConnection:
+    """One websocket to the browser, shared by every tab's session."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.next_id = 0
+        self.pending = {}
+        self.listeners = {}
+        self.reader = asyncio.get_running_loop().create_task(self.read())
+
+    @classmethod
+    async def connect(cls, url: str):
+        import websockets
+        try:
+            websocket = await websockets.connect(url, max_size=None)
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            raise CdpError(f"Could not connect to Chrome: {e}")
+        return cls(websocket)
+
+    async def send(self, method: str, params: dict | None = None,
+                   session_id: str | None = None):
+        # Other tabs can send while this one awaits, so the id is kept here
+        # rather than read from next_id again
+        self.next_id += 1
+        message_id = self.next_id
+        message = {"id": message_id, "method": method,
+                   "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        # Nothing would ever answer once the reader has stopped
+        if self.reader.done():
+            raise CdpError("Connection closed")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = future
+        try:
+            await self.websocket.send(json.dumps(message))
+        except Exception as e:
+            self.pending.pop(message_id, None)
+            raise CdpError(f"Connection closed: {e}")
+        return await future
+
+    # Returns a future for the next `method` event in the session
+    def expect(self, method: str, session_id: str):
+        future = asyncio.get_running_loop().create_future()
+        self.listeners.setdefault((session_id, method), []).append(future)
+        return future
+
+    async def read(self):
+        try:
+            async for raw in self.websocket:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self.pending.pop(message["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(
+                            CdpError(message["error"].get("message")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                key = (message.get("sessionId"), message.get("method"))
+                for future in self.listeners.pop(key, []):
+                    if not future.done():
+                        future.set_result(message.get("params", {}))
+        except Exception as e:
+            logging.error(f"Chrome DevTools connection failed\n{e}")
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CdpError("Connection closed"))
+            self.pending.clear()
+
+    async def close(self):
+        try:
+            await self.websocket.close()
+        except Exception as e:
+            raise CdpError(f"Connection closed: {e}")
+        await self.reader
+
+
+class CdpTab(Transport):
+    """A browser tab with blocking methods that are safe to call from any
+    thread. Scripts are the same ones the Selenium backend runs with
+    execute_async_script.
+    """
+
+    def __init__(self, browser: CdpBrowser, target_id: str, session_id: str,
+                 generation: int):
+        self.browser = browser
+        self.config = browser.config
+        self.target_id = target_id
+        self.session_id = session_id
+        # The Chrome launch the tab belongs to, and its connection
+        self.generation = generation
+        self.connection = browser.connection
+
+    async def send(self, method: str, params: dict | None = None):
+        return await self.connection.send(method, params, self.session_id)
+
+    def navigate(self, url: str):
+        self.browser.run(self.load(url), self.config.max_timeout + 5)
+
+    async def load(self, url: str):
+        event = LOAD_EVENTS[self.config.page_load_strategy]
+        loaded = None
+        if event is not None:
+            loaded = self.connection.expect(event, self.session_id)
+        result = await self.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise CdpError(f"Could not load {url}: {result['errorText']}")
+        if loaded is None:
+            return
+        try:
+            await asyncio.wait_for(loaded, self.config.max_timeout)
+        except asyncio.TimeoutError:
+            raise CdpTimeout(f"Timed out loading {url}")
+
+    def run_script(self, script: str, *args):
+        return self.browser.run(
+            self.evaluate(to_promise_expression(script, *args)),
+            self.config.max_timeout + 5
+        )
+
+    async def evaluate(self, expression: str):
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "awaitPromise": True,
+            "returnByValue": True
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = details.get("exception", {}).get("description")
+            raise CdpError(description or details.get("text"))
+        return result["result"].get("value")
+
+    def wait_for(self, xpath: str, visible: bool, timeout: float) -> bool:
+        return self.run_script(
+            WAIT_FOR_ELEMENT_SCRIPT, xpath, visible, timeout * 1000)
+
+    def fill_and_send(self, subject: str, message: str,
+                      timeout: float) -> dict:
+        return self.run_script(
+            FILL_AND_SEND_SCRIPT, subject, message, timeout * 1000)
+
+    def click(self, xpath: str):
+        if not self.run_script(CLICK_SCRIPT, xpath):
+            raise CdpError(f"Could not find {xpath} to click")
+
+    def get_attribute(self, xpath: str, name: str):
+        return self.run_script(GET_ATTRIBUTE_SCRIPT, xpath, name)
+
+    def get_url(self):
+        return self.run_script("arguments[0](location.href);")
+
+    def get_cookies(self, urls: list[str]) -> list[dict]:
+        result = self.browser.run(
+            self.send("Network.getCookies", {"urls": urls}),
+            self.config.max_timeout
+        )
+        return result["cookies"]
+
+    def close(self):
+        try:
+            self.browser.run(
+                self.connection.send(
+                    "Target.closeTarget", {"targetId": self.target_id}),
+                self.config.max_timeout
+            )
+        except CdpError as e:
+            logging.debug(f"Could not close tab {self.target_id}\n{e}")
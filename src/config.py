@@ -1,13 +1,17 @@
+import hashlib
 import json
 import logging
 import os
 import random
-import pandas as pd
-import dotenv
-from selenium import webdriver
+import time
+import zlib
+from urllib.parse import urlsplit
 
-from src.types.student import Student
-from src.utils import time_str_to_seconds
+from src.ledger import DELIVERED, DeliveryLedger
+from src.template import MessageTemplate
+from src.roster import Roster
+from src.utils import STATS_FILE, get_shard_stats_file, parse_shard, \
+    time_str_to_seconds
 
 DEFAULT_CONFIG = {
     "student_csv_file": "students.csv",
@@ -20,22 +24,93 @@ DEFAULT_CONFIG = {
     "handshake_url": "https://app.joinhandshake.com/edu",
     "chromedriver_path": "chromedriver-win64",
     "message_subject": None,
-    "chrome_data_dir": "%HOMEPATH%\\AppData\\Local\\Google\\Chrome\\User Data"
+    "chrome_data_dir": "%HOMEPATH%\\AppData\\Local\\Google\\Chrome\\User Data",
+    "pool_size": 1,
+    "recycle_window": 10,
+    "recycle_max_memory_mb": 1024,
+    "recycle_max_latency_drift": 2.0,
+    "recycle_max_error_rate": 0.5,
+    "standby_webdriver": False,
+    "direct_compose": True,
+    "compose_url": None,
+    "fast_text_entry": True,
+    "script_send": False,
+    "event_waits": True,
+    "wait_poll_interval": 0.5,
+    "page_load_strategy": "eager",
+    "blocked_urls": [
+        "*.png",
+        "*.jpg",
+        "*.jpeg",
+        "*.gif",
+        "*.webp",
+        "*.svg",
+        "*.ico",
+        "*.woff",
+        "*.woff2",
+        "*.ttf",
+        "*.mp4",
+        "*.webm",
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*segment.io*",
+        "*hotjar.com*"
+    ],
+    "backend": "selenium",
+    "chrome_path": None,
+    "journal_sync_interval": 1.0,
+    "delivery_ledger": True,
+    "campaign": None,
+    "adaptive_pacing": True,
+    "pacing_floor": None,
+    "pacing_ceiling": 300,
+    "pacing_step": 1,
+    "pacing_backoff": 2.0,
+    "deferred_retries": True,
+    "retry_backoff": 30,
+    "http_send": False,
+    "http_send_url": None,
+    "fake_latency": 0,
+    "fake_fail_rate": 0.0,
+    "record_file": "recorded_messages.jsonl"
 }
 
+CHROME_ARGS = [
+    "--start-minimized",
+    "--headless=new",
+    "--disable-popup-blocking",
+    "enable-automation",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-browser-side-navigation",
+    "--disable-gpu",
+    "--disable-extensions"
+]
+
 DEFAULT_ENV = "VAL1=\nVAL2=\nVAL3=\n"
 
 
 class Config:
     def __init__(self):
-        pass
+        # Set from the command line rather than config.json, since every
+        # computer shares the same config
+        self.shard = None
 
     def load(self):
         self.load_env()
         self.load_config()
         self.load_students()
         self.load_message()
-        self.load_selenium()
+        self.validate_students()
+        self.load_ledger()
+        self.load_http_sender()
+        if self.backend == "cdp":
+            self.load_cdp()
+        elif self.backend in ("fake", "record"):
+            self.load_fake()
+        else:
+            self.load_selenium()
 
     def load_message(self):
         logging.info("loading message file")
@@ -51,7 +126,84 @@ class Config:
             print(message)
             exit(0)
 
+        self.message_template = MessageTemplate(self.message)
+        for variable in self.message_template.validate(self.student_columns):
+            message = f"message.txt uses variable {{{variable}}}, but " \
+                f"{self.student_csv_file} has no {variable} column. " \
+                f"It will be left blank in every message."
+            logging.warning(message)
+            print(message)
+        logging.info(f"Compiled message.txt with "
+                     f"{len(self.message_template.variables)} variables")
+
+    # Checks the whole students csv up front so problems are reported before
+    # Chrome launches, and bad or repeated rows are skipped without reading
+    # them again
+    def validate_students(self):
+        import pandas as pd
+        from src.validation import validate_roster
+        start = time.monotonic()
+        try:
+            report = validate_roster(self.student_csv_file,
+                                     self.message_template.variables)
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            message = f"Could not validate {self.student_csv_file}, rows " \
+                f"will be checked as they are sent to\n{e}"
+            logging.warning(message)
+            print(message)
+            return
+        self.modified = report.modified
+        self.skip_rows = report.skip_rows
+        self.save_modified()
+
+        summary = report.summary()
+        message = f"Checked {report.rows} students in " \
+            f"{self.student_csv_file} in {time.monotonic() - start:.2f}s"
+        if len(summary) > 0:
+            problems = "\n".join(
+                f"\t{problem}: {count}" for problem, count in summary.items()
+            )
+            message += f", details saved to modified.json\n{problems}"
+        logging.info(message)
+        print(message)
+
+    def load_ledger(self):
+        self.ledger = None
+        if self.delivery_ledger:
+            self.ledger = DeliveryLedger(self.get_campaign())
+        # A run that stops with students deferred resumes from the first of
+        # them, and only the ledger keeps the students after it from being
+        # sent to again
+        elif self.deferred_retries:
+            message = "deferred_retries needs delivery_ledger, retrying " \
+                "failed students straight away instead"
+            logging.warning(message)
+            print(message)
+            self.deferred_retries = False
+
+    def load_http_sender(self):
+        self.http_sender = None
+        if not self.http_send:
+            return
+        if self.http_send_url is None:
+            message = "http_send is on but http_send_url is not set, " \
+                "sending through the browser instead"
+            logging.warning(message)
+            print(message)
+            return
+        from src.http_send import HttpSender
+        self.http_sender = HttpSender(self)
+
+    # Students are only skipped for having been sent the same message, so
+    # by default a campaign is identified by its subject and message
+    def get_campaign(self):
+        if self.campaign is not None:
+            return self.campaign
+        text = f"{self.message_subject or ''}\0{self.message}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
     def load_env(self):
+        import dotenv
         if dotenv.load_dotenv():
             logging.info("Loaded environment variables from .env")
         else:
@@ -86,11 +238,14 @@ class Config:
     def load_students(self):
         self.index = 0
         self.modified = []
+        self.skip_rows = set()
         try:
-            with open(self.student_csv_file) as students:
-                self.students = pd.read_csv(students)
-                logging.info(f"Found {len(self.students)} students in "
-                             f"{self.student_csv_file}")
+            self.students = Roster(
+                path=self.student_csv_file,
+                verify_student_id=self.verify_student_id
+            )
+            self.student_columns = self.students.columns
+            logging.info(f"Streaming students from {self.student_csv_file}")
         except FileNotFoundError:
             message = f"Could not find file " \
                 f"{self.student_csv_file}. " \
@@ -100,39 +255,55 @@ class Config:
             print(message)
             exit(1)
 
+    def load_cdp(self):
+        from src.cdp import CdpBrowser
+        logging.debug("Initializing Chrome DevTools connection...")
+        self.webdriver = None
+        self.browser = CdpBrowser(self, self.chrome_data_dir)
+
+    # The fake and record backends send nothing and need no Chrome
+    def load_fake(self):
+        from src.transport import FakeBrowser, RecordBrowser
+        logging.debug(f"Using the {self.backend} backend")
+        self.webdriver = None
+        if self.backend == "record":
+            self.browser = RecordBrowser(self)
+        else:
+            self.browser = FakeBrowser(self)
+
     def load_selenium(self):
         logging.debug("Initializing Selenium...")
+        self.browser = None
         # Set PATH environmental variable to chromedriver-win64
 
         os.environ["PATH"] += self.chromedriver_path
         logging.debug("Added environmental Path")
 
+        self.webdriver = self.create_webdriver(self.chrome_data_dir)
+
+    def create_webdriver(self, chrome_data_dir: str):
+        from selenium import webdriver
         chrome_options = webdriver.ChromeOptions()
-        args = [
-            "--start-minimized",
-            "--headless=new",
-            "--disable-popup-blocking",
-            "enable-automation",
-            "--no-sandbox",
-            "--disable-dev-shm-usage",
-            "--disable-browser-side-navigation",
-            "--disable-gpu",
-            "--disable-extensions"
-        ]
+        args = CHROME_ARGS
         for arg in args:
             chrome_options.add_argument(arg)
-        chrome_options.add_argument(f"user-data-dir={self.chrome_data_dir}")
+        chrome_options.add_argument(f"user-data-dir={chrome_data_dir}")
+        chrome_options.page_load_strategy = self.page_load_strategy
         # Create a new instance of the Chrome driver
-        self.webdriver = webdriver.Chrome(options=chrome_options)
-        self.webdriver.set_page_load_timeout(self.max_timeout)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(self.max_timeout)
+        driver.set_script_timeout(self.max_timeout + 1)
+        if len(self.blocked_urls) > 0:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {
+                "urls": self.blocked_urls
+            })
+            logging.debug(f"Blocking {len(self.blocked_urls)} url patterns")
 
         logging.debug(f"Initialized new Chrome webdriver instance with the"
                       f"following arguments: [{', '.join(args)}]")
-        logging.info("Chrome webdriver initialized")
-
-    def reset_webdriver(self):
-        self.webdriver.quit()
-        self.load_selenium()
+        logging.info(f"Chrome webdriver initialized ({chrome_data_dir})")
+        return driver
 
     def set_config(self, config):
         self.student_csv_file = self.get_config_val_of(
@@ -179,6 +350,130 @@ class Config:
             config=config,
             key='chrome_data_dir'
         )
+        self.pool_size = self.get_config_val_of(
+            config=config,
+            key='pool_size'
+        )
+        self.recycle_window = self.get_config_val_of(
+            config=config,
+            key='recycle_window'
+        )
+        self.recycle_max_memory_mb = self.get_config_val_of(
+            config=config,
+            key='recycle_max_memory_mb'
+        )
+        self.recycle_max_latency_drift = self.get_config_val_of(
+            config=config,
+            key='recycle_max_latency_drift'
+        )
+        self.recycle_max_error_rate = self.get_config_val_of(
+            config=config,
+            key='recycle_max_error_rate'
+        )
+        self.standby_webdriver = self.get_config_val_of(
+            config=config,
+            key='standby_webdriver'
+        )
+        self.direct_compose = self.get_config_val_of(
+            config=config,
+            key='direct_compose'
+        )
+        self.compose_url = self.get_config_val_of(
+            config=config,
+            key='compose_url'
+        )
+        self.fast_text_entry = self.get_config_val_of(
+            config=config,
+            key='fast_text_entry'
+        )
+        self.script_send = self.get_config_val_of(
+            config=config,
+            key='script_send'
+        )
+        self.event_waits = self.get_config_val_of(
+            config=config,
+            key='event_waits'
+        )
+        self.wait_poll_interval = self.get_config_val_of(
+            config=config,
+            key='wait_poll_interval'
+        )
+        self.page_load_strategy = self.get_config_val_of(
+            config=config,
+            key='page_load_strategy'
+        )
+        self.blocked_urls = self.get_config_val_of(
+            config=config,
+            key='blocked_urls'
+        )
+        self.backend = self.get_config_val_of(
+            config=config,
+            key='backend'
+        )
+        self.chrome_path = self.get_config_val_of(
+            config=config,
+            key='chrome_path'
+        )
+        self.journal_sync_interval = self.get_config_val_of(
+            config=config,
+            key='journal_sync_interval'
+        )
+        self.delivery_ledger = self.get_config_val_of(
+            config=config,
+            key='delivery_ledger'
+        )
+        self.campaign = self.get_config_val_of(
+            config=config,
+            key='campaign'
+        )
+        self.adaptive_pacing = self.get_config_val_of(
+            config=config,
+            key='adaptive_pacing'
+        )
+        self.pacing_floor = self.get_config_val_of(
+            config=config,
+            key='pacing_floor'
+        )
+        self.pacing_ceiling = self.get_config_val_of(
+            config=config,
+            key='pacing_ceiling'
+        )
+        self.pacing_step = self.get_config_val_of(
+            config=config,
+            key='pacing_step'
+        )
+        self.pacing_backoff = self.get_config_val_of(
+            config=config,
+            key='pacing_backoff'
+        )
+        self.deferred_retries = self.get_config_val_of(
+            config=config,
+            key='deferred_retries'
+        )
+        self.retry_backoff = self.get_config_val_of(
+            config=config,
+            key='retry_backoff'
+        )
+        self.http_send = self.get_config_val_of(
+            config=config,
+            key='http_send'
+        )
+        self.http_send_url = self.get_config_val_of(
+            config=config,
+            key='http_send_url'
+        )
+        self.fake_latency = self.get_config_val_of(
+            config=config,
+            key='fake_latency'
+        )
+        self.fake_fail_rate = self.get_config_val_of(
+            config=config,
+            key='fake_fail_rate'
+        )
+        self.record_file = self.get_config_val_of(
+            config=config,
+            key='record_file'
+        )
 
     def get_config_val_of(self, config, key):
         if key not in DEFAULT_CONFIG:
@@ -192,61 +487,105 @@ class Config:
         return config[key]
 
     def has_next_student(self):
-        return self.index < len(self.students)
+        return self.students.has_row(self.index)
 
     def get_next_student(self):
-        if not self.has_next_student():
-            return -1
-        student = self.students[self.index]
-        self.index += 1
-        if student.student_id == -1:
-            logging.debug(f"Skipping row {self.index} of "
-                          f"{self.student_csv_file}")
-            return self.get_next_student()
+        # Loop rather than recurse over skipped rows so a long run of bad
+        # rows in a large file cannot hit the recursion limit
+        while True:
+            if not self.has_next_student():
+                return -1
+            if self.index in self.skip_rows:
+                self.index += 1
+                continue
+            student = self.students.get(self.index)
+            self.index += 1
+            if student.student_id == -1:
+                logging.debug(f"Skipping row {self.index} of "
+                              f"{self.student_csv_file}")
+                continue
+            if not self.in_shard(student.student_id):
+                continue
+            if self.ledger is None:
+                break
+            skip_reason = self.ledger.claim(student.student_id)
+            if skip_reason is None:
+                break
+            if skip_reason == DELIVERED:
+                logging.info(f"Skipping {student.student_id} at row "
+                             f"{self.index}, they were already sent this "
+                             f"message")
+            else:
+                logging.warning(f"Skipping {student.student_id} at row "
+                                f"{self.index}, they are in "
+                                f"{self.student_csv_file} more than once")
+            self.add_modified(student.student_id, skip_reason, "skip",
+                              self.index - 1)
         logging.debug(f"Next student: {student} "
                       f"(row: {self.index})")
         return student
 
-    def verify_student_id(self, student_id: str | int, row_index):
+    def verify_student_id(self, student_id: str | int | None, row_index):
+        if isinstance(student_id, str):
+            student_id = student_id.strip()
+            if student_id == "":
+                student_id = None
         if student_id is None:
             logging.warning(f"Student id {student_id} at row {row_index} "
                             f"of {self.student_csv_file} is None. "
                             f"This row will be skipped.")
-            self.add_modified(student_id, "none", "skip")
             return -1
-        if isinstance(student_id, str) and not student_id.isdigit():
+        if isinstance(student_id, str) and \
+                not student_id.removeprefix("-").isdigit():
             logging.warning(f"Student id {student_id} at row {row_index} "
                             f"of {self.student_csv_file} is not an integer. "
                             f"This row will be skipped.")
-            self.add_modified(student_id, "not_int", "skip")
             return -1
         student_id = int(student_id)
         if student_id < 0:
             logging.warning(f"Student id {student_id} at row {row_index} "
                             f"of {self.student_csv_file} is negative. "
                             f"This row will be converted to positive.")
-            self.add_modified(student_id, "negative", "abs")
             student_id = abs(student_id)
         if student_id > 99999999:
             logging.warning(f"Student id {student_id} at row {row_index} "
                             f"of {self.student_csv_file} is too large. "
                             f"This row will be skipped.")
-            self.add_modified(student_id, "too_big", "skip")
+            return -1
         return student_id
 
-    def add_modified(self, student_id, type, action="skip"):
+    def add_modified(self, student_id, type, action="skip", row_index=None):
         self.modified.append({
             "handshake_id": student_id,
-            "row_index": self.index,
+            "row_index": self.index if row_index is None else row_index,
             "type": type,
             "action": action})
 
     def save_modified(self):
-        if len(self.modified) == 0:
-            return
         with open('modified.json', 'w') as mod:
             json.dump(self.modified, mod, indent=4)
-        logging.info(f"Saved {len(self.modified)} modified students to {mod}")
+        logging.info(f"Saved {len(self.modified)} modified students to "
+                     f"modified.json")
+
+    # Whether this computer's shard sends to the student. Uses crc32 rather
+    # than hash() so every computer splits the students the same way
+    def in_shard(self, student_id: int):
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return zlib.crc32(str(student_id).encode()) % count == index - 1
+
+    def get_stats_file(self):
+        if self.shard is None:
+            return STATS_FILE
+        return get_shard_stats_file(self.shard)
+
+    # Describes how pages are loaded so page load times from runs with
+    # different settings can be compared
+    def get_page_load_mode(self):
+        if len(self.blocked_urls) > 0:
+            return f"{self.page_load_strategy}, blocking resources"
+        return self.page_load_strategy
 
     def get_rand_delay_time(self):
         delay = self.min_delay + random.randint(0, self.random_delay)
@@ -353,7 +692,10 @@ class Config:
     def handshake_url(self, val: str):
         if not isinstance(val, str):
             raise ValueError("handshake_url must be a string")
-        if "joinhandshake.com" not in val:
+        # Local urls are allowed for testing against a stand-in server
+        host = urlsplit(val).hostname
+        if "joinhandshake.com" not in val and \
+                host not in ("localhost", "127.0.0.1"):
             raise ValueError("handshake_url must be a Handshake url")
         self._handshake_url = val
 
@@ -380,21 +722,14 @@ class Config:
         self._message_subject = val
 
     @property
-    def students(self) -> list[Student]:
+    def students(self) -> Roster:
         return self._students
 
     @students.setter
-    def students(self, val: pd.DataFrame):
-        self._students = []
-        if not isinstance(val, pd.DataFrame):
-            raise ValueError("students must be a pandas DataFrame")
-        for row in range(len(val)):
-            student_row = val.iloc[row]
-            id = self.verify_student_id(student_row.get("handshake_id"), row)
-            self._students.append(Student(
-                student_id=id,
-                data=student_row.to_dict()
-            ))
+    def students(self, val: Roster):
+        if not isinstance(val, Roster):
+            raise ValueError("students must be a Roster")
+        self._students = val
 
     @property
     def modified(self) -> list[dict]:
@@ -415,3 +750,355 @@ class Config:
         if not isinstance(val, str):
             raise ValueError("chrome_data_dir must be a string")
         self._chrome_data_dir = val
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @pool_size.setter
+    def pool_size(self, val: int):
+        if not isinstance(val, int):
+            raise ValueError("pool_size must be an integer")
+        if val < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._pool_size = val
+
+    @property
+    def recycle_window(self) -> int:
+        return self._recycle_window
+
+    @recycle_window.setter
+    def recycle_window(self, val: int):
+        if not isinstance(val, int):
+            raise ValueError("recycle_window must be an integer")
+        if val < 1:
+            raise ValueError("recycle_window must be at least 1")
+        self._recycle_window = val
+
+    @property
+    def recycle_max_memory_mb(self) -> int:
+        return self._recycle_max_memory_mb
+
+    @recycle_max_memory_mb.setter
+    def recycle_max_memory_mb(self, val: int):
+        if not isinstance(val, int):
+            raise ValueError("recycle_max_memory_mb must be an integer")
+        self._recycle_max_memory_mb = val
+
+    @property
+    def recycle_max_latency_drift(self) -> float:
+        return self._recycle_max_latency_drift
+
+    @recycle_max_latency_drift.setter
+    def recycle_max_latency_drift(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("recycle_max_latency_drift must be a number")
+        self._recycle_max_latency_drift = val
+
+    @property
+    def recycle_max_error_rate(self) -> float:
+        return self._recycle_max_error_rate
+
+    @recycle_max_error_rate.setter
+    def recycle_max_error_rate(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("recycle_max_error_rate must be a number")
+        if val != -1 and not 0 < val <= 1:
+            raise ValueError("recycle_max_error_rate must be between 0 and 1")
+        self._recycle_max_error_rate = val
+
+    @property
+    def standby_webdriver(self) -> bool:
+        return self._standby_webdriver
+
+    @standby_webdriver.setter
+    def standby_webdriver(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("standby_webdriver must be a boolean")
+        self._standby_webdriver = val
+
+    @property
+    def direct_compose(self) -> bool:
+        return self._direct_compose
+
+    @direct_compose.setter
+    def direct_compose(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("direct_compose must be a boolean")
+        self._direct_compose = val
+
+    @property
+    def compose_url(self) -> str | None:
+        return self._compose_url
+
+    @compose_url.setter
+    def compose_url(self, val: str | None):
+        if not isinstance(val, str) and val is not None:
+            raise ValueError("compose_url must be a string or None")
+        if val is not None and "{student_id}" not in val:
+            raise ValueError("compose_url must contain {student_id}")
+        self._compose_url = val
+
+    @property
+    def fast_text_entry(self) -> bool:
+        return self._fast_text_entry
+
+    @fast_text_entry.setter
+    def fast_text_entry(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("fast_text_entry must be a boolean")
+        self._fast_text_entry = val
+
+    @property
+    def script_send(self) -> bool:
+        return self._script_send
+
+    @script_send.setter
+    def script_send(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("script_send must be a boolean")
+        self._script_send = val
+
+    @property
+    def event_waits(self) -> bool:
+        return self._event_waits
+
+    @event_waits.setter
+    def event_waits(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("event_waits must be a boolean")
+        self._event_waits = val
+
+    @property
+    def wait_poll_interval(self) -> float:
+        return self._wait_poll_interval
+
+    @wait_poll_interval.setter
+    def wait_poll_interval(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("wait_poll_interval must be a number")
+        if val <= 0:
+            raise ValueError("wait_poll_interval must be greater than 0")
+        self._wait_poll_interval = val
+
+    @property
+    def page_load_strategy(self) -> str:
+        return self._page_load_strategy
+
+    @page_load_strategy.setter
+    def page_load_strategy(self, val: str):
+        if val not in ("normal", "eager", "none"):
+            raise ValueError("page_load_strategy must be normal, eager, "
+                             "or none")
+        self._page_load_strategy = val
+
+    @property
+    def blocked_urls(self) -> list[str]:
+        return self._blocked_urls
+
+    @blocked_urls.setter
+    def blocked_urls(self, val: list[str]):
+        if not isinstance(val, list) or \
+                not all(isinstance(url, str) for url in val):
+            raise ValueError("blocked_urls must be a list of strings")
+        self._blocked_urls = val
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @backend.setter
+    def backend(self, val: str):
+        if val not in ("selenium", "cdp", "fake", "record"):
+            raise ValueError("backend must be selenium, cdp, fake or record")
+        self._backend = val
+
+    @property
+    def chrome_path(self) -> str | None:
+        return self._chrome_path
+
+    @chrome_path.setter
+    def chrome_path(self, val: str | None):
+        if not isinstance(val, str) and val is not None:
+            raise ValueError("chrome_path must be a string or None")
+        self._chrome_path = val
+
+    @property
+    def journal_sync_interval(self) -> float:
+        return self._journal_sync_interval
+
+    @journal_sync_interval.setter
+    def journal_sync_interval(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("journal_sync_interval must be a number")
+        if val < 0:
+            raise ValueError("journal_sync_interval must be at least 0")
+        self._journal_sync_interval = val
+
+    @property
+    def delivery_ledger(self) -> bool:
+        return self._delivery_ledger
+
+    @delivery_ledger.setter
+    def delivery_ledger(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("delivery_ledger must be a boolean")
+        self._delivery_ledger = val
+
+    @property
+    def campaign(self) -> str | None:
+        return self._campaign
+
+    @campaign.setter
+    def campaign(self, val: str | None):
+        if not isinstance(val, str) and val is not None:
+            raise ValueError("campaign must be a string or None")
+        if isinstance(val, str) and ("\t" in val or "\n" in val):
+            raise ValueError("campaign cannot contain tabs or newlines")
+        self._campaign = val
+
+    @property
+    def adaptive_pacing(self) -> bool:
+        return self._adaptive_pacing
+
+    @adaptive_pacing.setter
+    def adaptive_pacing(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("adaptive_pacing must be a boolean")
+        self._adaptive_pacing = val
+
+    @property
+    def pacing_floor(self) -> float | None:
+        return self._pacing_floor
+
+    @pacing_floor.setter
+    def pacing_floor(self, val: float | None):
+        if val is not None and not isinstance(val, (int, float)):
+            raise ValueError("pacing_floor must be a number or None")
+        if val is not None and val < 0:
+            raise ValueError("pacing_floor must be at least 0")
+        self._pacing_floor = val
+
+    @property
+    def pacing_ceiling(self) -> float:
+        return self._pacing_ceiling
+
+    @pacing_ceiling.setter
+    def pacing_ceiling(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("pacing_ceiling must be a number")
+        if val < 0:
+            raise ValueError("pacing_ceiling must be at least 0")
+        self._pacing_ceiling = val
+
+    @property
+    def pacing_step(self) -> float:
+        return self._pacing_step
+
+    @pacing_step.setter
+    def pacing_step(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("pacing_step must be a number")
+        if val < 0:
+            raise ValueError("pacing_step must be at least 0")
+        self._pacing_step = val
+
+    @property
+    def pacing_backoff(self) -> float:
+        return self._pacing_backoff
+
+    @pacing_backoff.setter
+    def pacing_backoff(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("pacing_backoff must be a number")
+        if val < 1:
+            raise ValueError("pacing_backoff must be at least 1")
+        self._pacing_backoff = val
+
+    @property
+    def deferred_retries(self) -> bool:
+        return self._deferred_retries
+
+    @deferred_retries.setter
+    def deferred_retries(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("deferred_retries must be a boolean")
+        self._deferred_retries = val
+
+    @property
+    def retry_backoff(self) -> float:
+        return self._retry_backoff
+
+    @retry_backoff.setter
+    def retry_backoff(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("retry_backoff must be a number")
+        if val < 0:
+            raise ValueError("retry_backoff must be at least 0")
+        self._retry_backoff = val
+
+    @property
+    def shard(self) -> tuple[int, int] | None:
+        return self._shard
+
+    @shard.setter
+    def shard(self, val: str | tuple[int, int] | None):
+        if isinstance(val, str):
+            val = parse_shard(val)
+        if val is not None and (not isinstance(val, tuple) or len(val) != 2):
+            raise ValueError("shard must be i/N or None")
+        self._shard = val
+
+    @property
+    def http_send(self) -> bool:
+        return self._http_send
+
+    @http_send.setter
+    def http_send(self, val: bool):
+        if not isinstance(val, bool):
+            raise ValueError("http_send must be a boolean")
+        self._http_send = val
+
+    @property
+    def http_send_url(self) -> str | None:
+        return self._http_send_url
+
+    @http_send_url.setter
+    def http_send_url(self, val: str | None):
+        if not isinstance(val, str) and val is not None:
+            raise ValueError("http_send_url must be a string or None")
+        self._http_send_url = val
+
+    @property
+    def fake_latency(self) -> float:
+        return self._fake_latency
+
+    @fake_latency.setter
+    def fake_latency(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("fake_latency must be a number")
+        if val < 0:
+            raise ValueError("fake_latency must be at least 0")
+        self._fake_latency = val
+
+    @property
+    def fake_fail_rate(self) -> float:
+        return self._fake_fail_rate
+
+    @fake_fail_rate.setter
+    def fake_fail_rate(self, val: float):
+        if not isinstance(val, (int, float)):
+            raise ValueError("fake_fail_rate must be a number")
+        if val < 0 or val > 1:
+            raise ValueError("fake_fail_rate must be between 0 and 1")
+        self._fake_fail_rate = val
+
+    @property
+    def record_file(self) -> str:
+        return self._record_file
+
+    @record_file.setter
+    def record_file(self, val: str):
+        if not isinstance(val, str):
+            raise ValueError("record_file must be a string")
+        self._record_file = val
@@ -0,0 +1,87 @@
+from typing import Callable
+
+from selenium.common.exceptions import ElementClickInterceptedException, \
+    ElementNotInteractableException, InvalidSessionIdException, \
+    NoSuchElementException, NoSuchWindowException, \
+    StaleElementReferenceException, TimeoutException, WebDriverException
+
+from src.cdp import CdpError, CdpTimeout
+
+# Failure classes
+PAGE_LOAD_TIMEOUT = "page_load_timeout"
+MISSING_ELEMENT = "missing_element"
+STALE_ELEMENT = "stale_element"
+DEAD_SESSION = "dead_session"
+AUTH_REDIRECT = "auth_redirect"
+UNKNOWN = "unknown"
+
+# Recovery actions
+# Try again straight away, without waiting for another send slot
+RETRY = "retry"
+# Try again in the next send slot, which loads the page again
+RELOAD = "reload"
+# Restart Chrome, then try again straight away
+RESTART = "restart"
+# Stop the run and resume from this student next time
+ABORT = "abort"
+
+RECOVERY_ACTIONS = {
+    PAGE_LOAD_TIMEOUT: RELOAD,
+    MISSING_ELEMENT: RELOAD,
+    STALE_ELEMENT: RETRY,
+    DEAD_SESSION: RESTART,
+    AUTH_REDIRECT: ABORT,
+    UNKNOWN: RELOAD,
+}
+
+# Pieces of WebDriver error messages that mean Chrome or chromedriver is gone
+DEAD_SESSION_MESSAGES = (
+    "invalid session id",
+    "session deleted",
+    "chrome not reachable",
+    "disconnected: not connected to devtools",
+    "disconnected: received inspector.detached event",
+    "target window already closed",
+    "no such window",
+    "connection closed",
+    "connection refused",
+)
+
+# Chrome's network errors, like net::ERR_INTERNET_DISCONNECTED. Chrome is
+# fine, so the page is loaded again instead of restarting it
+NETWORK_ERROR_PREFIX = "net::err_"
+
+# Pieces of urls Handshake redirects to when the session is logged out
+LOGIN_URLS = ("/login", "/sso", "/saml", "sign_in")
+
+
+def classify_failure(error: Exception, phase: str | None,
+                     get_url: Callable[[], str | None]) -> str:
+    """Sort an exception raised while sending into one of the failure
+    classes above. `phase` is the send phase that raised it and `get_url`
+    returns the page Chrome is on, which is only asked for once the browser
+    is known to still be alive.
+    """
+    message = str(error).lower()
+    if NETWORK_ERROR_PREFIX in message:
+        return PAGE_LOAD_TIMEOUT
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException,
+                          ConnectionError)) or \
+            any(part in message for part in DEAD_SESSION_MESSAGES):
+        return DEAD_SESSION
+    url = get_url()
+    if url is not None and any(part in url for part in LOGIN_URLS):
+        return AUTH_REDIRECT
+    if isinstance(error, (StaleElementReferenceException,
+                          ElementClickInterceptedException,
+                          ElementNotInteractableException)):
+        return STALE_ELEMENT
+    if isinstance(error, (TimeoutException, CdpTimeout)) and \
+            phase == "page_load":
+        return PAGE_LOAD_TIMEOUT
+    if isinstance(error, (NoSuchElementException, TimeoutException,
+                          CdpError)):
+        return MISSING_ELEMENT
+    if isinstance(error, WebDriverException) and phase == "page_load":
+        return PAGE_LOAD_TIMEOUT
+    return UNKNOWN
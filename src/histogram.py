@@ -0,0 +1,38 @@
+import math
+
+# Bucket upper bounds grow by this factor from SMALLEST_BUCKET seconds, so a
+# percentile read from the histogram is within 25% of the real value
+BUCKET_GROWTH = 1.25
+SMALLEST_BUCKET = 0.01
+
+
+# Histograms are plain dicts so they can be saved to stats.json and combined
+# with merge_stats_sections
+def new_histogram():
+    return {"count": 0, "time": 0.0, "max_time": 0.0, "buckets": {}}
+
+
+def record_histogram(histogram: dict, seconds: float):
+    bucket = 0
+    if seconds > SMALLEST_BUCKET:
+        bucket = math.ceil(
+            math.log(seconds / SMALLEST_BUCKET, BUCKET_GROWTH) - 1e-9)
+    buckets = histogram["buckets"]
+    buckets[str(bucket)] = buckets.get(str(bucket), 0) + 1
+    histogram["count"] += 1
+    histogram["time"] += seconds
+    histogram["max_time"] = max(histogram["max_time"], seconds)
+
+
+def histogram_percentile(histogram: dict, percentile: float) -> float:
+    """Upper bound in seconds of the bucket holding the given percentile."""
+    if histogram["count"] == 0:
+        return 0
+    rank = math.ceil(histogram["count"] * percentile / 100)
+    seen = 0
+    for bucket in sorted(histogram["buckets"], key=int):
+        seen += histogram["buckets"][bucket]
+        if seen >= rank:
+            upper_bound = SMALLEST_BUCKET * BUCKET_GROWTH ** int(bucket)
+            return min(upper_bound, histogram["max_time"])
+    return histogram["max_time"]
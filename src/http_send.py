@@ -0,0 +1,126 @@
+import json
+import logging
+import re
+import threading
+from typing import Callable
+
+import urllib3
+
+# Consecutive failed http sends before sending through the browser for the
+# rest of the run
+HTTP_SEND_MAX_FAILURES = 3
+
+CSRF_TOKEN_PATTERN = re.compile(
+    r'<meta[^>]+name="csrf-token"[^>]+content="([^"]*)"')
+
+
+class HttpSendError(Exception):
+    pass
+
+
+class HttpSender:
+    """Sends messages by posting Handshake's create conversation request
+    straight to `http_send_url`, instead of loading the student's page and
+    filling in the message window.
+
+    The request carries the cookies of the logged in Chrome profile and the
+    csrf token of the Handshake page they load. Connections are kept alive
+    in a pool shared by every worker, so most sends cost one round trip.
+    Anything but a 2xx response raises HttpSendError so the message can be
+    sent through the browser instead.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.http = urllib3.PoolManager(
+            maxsize=config.pool_size,
+            retries=False,
+            timeout=urllib3.Timeout(total=config.max_timeout)
+        )
+        self.cookie_header = None
+        self.csrf_token = None
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failures < HTTP_SEND_MAX_FAILURES
+
+    def send(self, student_id: int, subject: str | None, message: str,
+             get_cookies: Callable[[], list[dict]]):
+        """Send `message` to the student. `get_cookies` returns the Chrome
+        session's cookies, and is only called when they are not loaded yet.
+        """
+        url = self.config.http_send_url.format(
+            handshake_url=self.config.handshake_url,
+            student_id=student_id
+        )
+        body = json.dumps({
+            "recipient_id": student_id,
+            "subject": subject or "",
+            "body": message
+        })
+        try:
+            response = self.http.request(
+                "POST",
+                url,
+                body=body,
+                headers=self.get_headers(get_cookies),
+                redirect=False
+            )
+        except urllib3.exceptions.HTTPError as e:
+            self.fail()
+            raise HttpSendError(f"Could not reach {url}: {e}")
+        if not 200 <= response.status < 300:
+            self.fail()
+            raise HttpSendError(f"{url} answered {response.status}")
+        self.failures = 0
+
+    def get_headers(self, get_cookies: Callable[[], list[dict]]):
+        with self.lock:
+            if self.cookie_header is None:
+                self.load_session(get_cookies())
+            headers = {
+                "Cookie": self.cookie_header,
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "X-Requested-With": "XMLHttpRequest"
+            }
+            if self.csrf_token is not None:
+                headers["X-CSRF-Token"] = self.csrf_token
+            return headers
+
+    def load_session(self, cookies: list[dict]):
+        self.cookie_header = "; ".join(
+            f"{cookie['name']}={cookie['value']}" for cookie in cookies)
+        self.csrf_token = None
+        try:
+            response = self.http.request(
+                "GET",
+                self.config.handshake_url,
+                headers={"Cookie": self.cookie_header},
+                redirect=False
+            )
+            match = CSRF_TOKEN_PATTERN.search(
+                response.data.decode("utf-8", "replace"))
+            if match is not None:
+                self.csrf_token = match.group(1)
+        except urllib3.exceptions.HTTPError as e:
+            logging.warning(f"Could not load the csrf token from "
+                            f"{self.config.handshake_url}\n{e}")
+        logging.info(f"Loaded {len(cookies)} cookies for http sends "
+                     f"({'with' if self.csrf_token else 'without'} a csrf "
+                     f"token)")
+
+    # The session may have expired, so the cookies are read from the browser
+    # again before the next http send
+    def fail(self):
+        with self.lock:
+            self.failures += 1
+            self.cookie_header = None
+            if self.failures == HTTP_SEND_MAX_FAILURES:
+                logging.warning("Http sends keep failing, sending through "
+                                "the browser for the rest of the run")
+
+    def close(self):
+        self.http.clear()
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import time
+
+JOURNAL_FILE = "stats_journal.jsonl"
+# Records after which the journal is folded into a new stats.json snapshot
+COMPACT_RECORDS = 1000
+
+
+class StatsJournal:
+    """Append-only log of stats changes, one JSON line per record.
+
+    `stats.json` is a snapshot and the journal holds every change made since
+    it was written, so progress is saved after each student without
+    rewriting the whole stats file. Records are flushed as they are written
+    so they survive the script crashing, and synced to disk at most every
+    `sync_interval` seconds so they also survive the computer crashing.
+    """
+
+    def __init__(self, seq: int = 0, sync_interval: float = 1.0,
+                 path: str = JOURNAL_FILE):
+        self.path = path
+        # Number of the last record written. Snapshots store the number of
+        # the last record they include so it is never applied twice
+        self.seq = seq
+        self.sync_interval = sync_interval
+        self.records = 0
+        self.last_sync = time.monotonic()
+        self.file = open(path, "a")
+
+    def append(self, position: int, time_running: float, delta: dict):
+        self.seq += 1
+        record = {
+            "seq": self.seq,
+            "current_position": position,
+            "time_running": time_running,
+            "delta": delta,
+        }
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+        self.records += 1
+        if time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    # Drops every record once a snapshot including them has been written
+    def truncate(self):
+        self.file.seek(0)
+        self.file.truncate()
+        self.sync()
+        self.records = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+# The journal that goes with a stats file: stats.json keeps its changes in
+# stats_journal.jsonl
+def get_journal_path(stats_path: str) -> str:
+    return f"{os.path.splitext(stats_path)[0]}_journal.jsonl"
+
+
+def read_journal(path: str = JOURNAL_FILE) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # The last line is cut off if the script stopped mid-write
+                logging.warning(f"Skipping incomplete record in {path}")
+    return records
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+
+LEDGER_FILE = "delivery_ledger.tsv"
+
+DELIVERED = "delivered"
+DUPLICATE = "duplicate"
+
+
+class DeliveryLedger:
+    """Every student a campaign's message was sent to, kept on disk.
+
+    The file has one `campaign<TAB>handshake_id` line per delivery and is
+    only ever appended to. The current campaign's ids are loaded into a set
+    when the script starts, so checking a student costs one set lookup no
+    matter how the students csv was edited, sorted or re-exported since the
+    last run.
+    """
+
+    def __init__(self, campaign: str, path: str = LEDGER_FILE):
+        self.campaign = campaign
+        self.path = path
+        self.lock = threading.Lock()
+        self.delivered = self.load()
+        # Students handed out this run, to skip ids repeated in the csv
+        self.claimed = set()
+        self.file = open(path, "a")
+        logging.info(f"Loaded {len(self.delivered)} delivered students for "
+                     f"campaign {campaign} from {path}")
+
+    def load(self) -> set[int]:
+        delivered = set()
+        if not os.path.exists(self.path):
+            return delivered
+        with open(self.path, "r") as f:
+            for line in f:
+                campaign, _, student_id = line.rstrip("\n").partition("\t")
+                if campaign != self.campaign:
+                    continue
+                try:
+                    delivered.add(int(student_id))
+                except ValueError:
+                    # The last line is cut off if the script stopped mid-write
+                    logging.warning(f"Skipping incomplete line in "
+                                    f"{self.path}")
+        return delivered
+
+    def claim(self, student_id: int) -> str | None:
+        """Return why the student should be skipped, or None and remember
+        they were handed out.
+        """
+        if student_id in self.delivered:
+            return DELIVERED
+        if student_id in self.claimed:
+            return DUPLICATE
+        self.claimed.add(student_id)
+        return None
+
+    def record(self, student_id: int):
+        with self.lock:
+            if student_id in self.delivered:
+                return
+            self.delivered.add(student_id)
+            self.file.write(f"{self.campaign}\t{student_id}\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
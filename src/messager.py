@@ -1,12 +1,27 @@
 
-import json
+import copy
 import logging
-import os
+import re
 import time
+from contextlib import contextmanager
+from src.cdp import CdpError, CdpTab
 from src.config import Config
+from src.failures import ABORT, AUTH_REDIRECT, RECOVERY_ACTIONS, RELOAD, \
+    RESTART, RETRY, classify_failure
+from src.histogram import new_histogram, record_histogram
+from src.http_send import HttpSendError
+from src.journal import COMPACT_RECORDS, StatsJournal, get_journal_path
+from src.pacer import Pacer
+from src.recycler import WebdriverRecycler
+from src.retry_queue import DEFERRED, RetryQueue
+from src.standby import WebdriverStandby
+from src.template import MessageTemplate
+from src.transport import SeleniumTransport
 from src.types.student import Student
 
 # from selenium.webdriver.remote.webelement import WebElement
+from selenium.common.exceptions import NoSuchElementException, \
+    TimeoutException, WebDriverException
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,17 +30,64 @@ from selenium.webdriver.common.action_chains import ActionChains
 
 from colorama import Fore, Style
 
-from src.utils import get_stats, get_stats_message, time_seconds_to_str
+from src.utils import diff_stats_sections, get_stats, get_stats_message, \
+    get_stats_sections, load_stats_file, merge_stats_sections, \
+    time_seconds_to_str, write_stats_file
+
+# Consecutive direct compose failures before falling back to the profile page
+# for the rest of the run
+DIRECT_COMPOSE_MAX_FAILURES = 3
+
+# Seconds to wait for the message box to show an inserted message
+TEXT_ENTRY_TIMEOUT = 2
+GET_FOCUSED_TEXT = """
+const element = document.activeElement;
+if (element === null) {
+    return null;
+}
+return element.value !== undefined ? element.value : element.innerText;
+"""
+
+MODAL_TITLE_XPATH = '//*[@id="modal-title"]'
+MESSAGE_BUTTON_XPATH = '//a[contains(@href,"send-message")]'
+SEND_BUTTON_XPATH = "//a[contains(@data-bind, 'click: createConversation')]"
+
+
+# Rich text boxes report line breaks and spaces differently than they were
+# inserted, so compare messages without those differences
+def normalize_text(text: str | None):
+    if text is None:
+        return None
+    return text.replace("\r\n", "\n").replace("\xa0", " ").strip()
 
 
 class Messager:
-    def __init__(self):
-        self.config = Config()
-        self.config.load()
-        self.wait = self.config.max_timeout
+    def __init__(self, shard: str | None = None):
+        config = Config()
+        config.shard = shard
+        config.load()
+        self.init_session(config, config.webdriver, config.chrome_data_dir)
+        self.pacer = Pacer(self.config)
+        self.retry_queue = RetryQueue(self.config)
+
+    # State of one Chrome session, set up the same way for pool workers
+    def init_session(self, config: Config, webdriver,
+                     chrome_data_dir: str | None):
+        self.config = config
+        self.webdriver = webdriver
+        self.chrome_data_dir = chrome_data_dir
+        self.standby = None
+        self.transport = None
+        self.phase = None
+        self.abort_reason = None
+        self.row = None
+        self.direct_compose_failures = 0
+        self.recycler = WebdriverRecycler(config)
+        self.wait = config.max_timeout
 
     def update_message_conditions(self):
-        self.has_more_students = self.config.has_next_student()
+        self.has_more_students = self.config.has_next_student() or \
+            len(self.retry_queue) > 0
         self.has_more_time = (
             self.config.max_time == -1
         ) or (
@@ -42,63 +104,107 @@ class Messager:
         self.load_stats()
         self.start_time = time.time() - self.time_running
         self.update_message_conditions()
-        counter = 0
 
         # === Send Messages ===
+        current_position = None
+        if self.config.pool_size > 1:
+            from src.pool import MessagerPool
+            current_position = MessagerPool(self).run()
+        else:
+            self.start_browser()
+            self.send_messages()
+            self.close()
+        if self.config.browser is not None:
+            self.config.browser.close()
+
+        self.update_stats(current_position)
+        self.journal.close()
+        if self.config.ledger is not None:
+            self.config.ledger.close()
+        if self.config.http_sender is not None:
+            self.config.http_sender.close()
+        # Adds the students skipped during the run to the pre-flight report
+        self.config.save_modified()
+
+        # === Report Results ===
+
+        stop_message = (
+            f"\n{Fore.LIGHTBLUE_EX}Finished after "
+            f"{Fore.LIGHTMAGENTA_EX}{time_seconds_to_str(self.time_running)} "
+            f"{Fore.LIGHTBLUE_EX}with reason: "
+            f"{Fore.LIGHTMAGENTA_EX}{self.get_stop_cause()}\n{Style.RESET_ALL}"
+        )
+        logging.debug(stop_message)
+        print(stop_message)
+
+        stats_message = get_stats_message(self.config.get_stats_file())
+        logging.info(stats_message)
+        print(stats_message)
+
+    def send_messages(self):
         while (self.has_more_students and
                self.has_more_time and
                self.has_more_messages):
-            counter += 1
-            if counter % 10 == 0:
-                message = f"Script has been running for {counter} " \
-                    f"iterations, saving stats to file and resetting " \
-                    f"webdriver..."
-                logging.info(message)
-                print(Fore.YELLOW + message + Style.RESET_ALL)
-                self.update_stats()
-                self.config.reset_webdriver()
-                self.wait = self.config.max_timeout
-
-            student = self.config.get_next_student()
-            if student == -1:
-                logging.debug("No more students to message")
-                break
+            self.recycle_webdriver_if_needed()
+
+            # Deferred students are retried as soon as their backoff is over
+            deferred = self.retry_queue.pop_ready()
+            if deferred is not None:
+                student, self.row = deferred.student, deferred.row
+                retries, attempts = deferred.retries, deferred.attempts
+            else:
+                student = self.config.get_next_student()
+                if student == -1:
+                    if len(self.retry_queue) == 0:
+                        logging.debug("No more students to message")
+                        break
+                    self.wait_for_deferred()
+                    continue
+                self.row = self.config.index - 1
+                retries, attempts = self.config.max_retries, 0
 
             # Send Message
             send_success = self.send_message_with_retry(
                 student=student,
                 message=self.config.message,
-                retries=self.config.max_retries
+                retries=retries,
+                attempts=attempts
             )
+            if send_success is None:
+                # Stopped before the first attempt, so resume from this row
+                if deferred is not None:
+                    self.retry_queue.push(deferred)
+                else:
+                    self.config.index -= 1
+                break
 
             self.update_time_running()
+            self.record_progress()
+            result = "Deferred" if send_success == DEFERRED else \
+                "Success" if send_success else "Fail"
             logging.debug("Finished attempt to send message to "
-                          f"{student.student_id} ({self.config.index})"
+                          f"{student.student_id} ({self.row})"
                           f"\n\tTime running: {self.time_running}s"
-                          f"\n\tResult: "
-                          f"{'Success' if send_success else 'Fail'}")
+                          f"\n\tResult: {result}")
             self.update_message_conditions()
 
-        self.update_stats()
-
-        # === Report Results ===
-
-        stop_message = (
-            f"\n{Fore.LIGHTBLUE_EX}Finished after "
-            f"{Fore.LIGHTMAGENTA_EX}{time_seconds_to_str(self.time_running)} "
-            f"{Fore.LIGHTBLUE_EX}with reason: "
-            f"{Fore.LIGHTMAGENTA_EX}{self.get_stop_cause()}\n{Style.RESET_ALL}"
-        )
-        logging.debug(stop_message)
-        print(stop_message)
-
-        stats_message = get_stats_message()
-        logging.info(stats_message)
-        print(stats_message)
+    # Sleeps until the next deferred student is ready, or the run runs out
+    # of time
+    def wait_for_deferred(self):
+        sleep_time = self.retry_queue.wait_time()
+        if self.config.max_time != -1:
+            sleep_time = min(sleep_time,
+                             max(self.config.max_time - self.time_running, 0))
+        logging.debug(f"Waiting {sleep_time}s for a deferred student...")
+        time.sleep(sleep_time)
+        self.update_time_running()
+        self.update_message_conditions()
 
     # Determines the reason for stopping the send message loop
     def get_stop_cause(self):
-        if not self.has_more_messages:
+        if self.abort_reason is not None:
+            return self.abort_reason
+        elif not self.has_more_messages:
             return "No more students to message"
         elif (
             self.config.max_time != -1
@@ -120,53 +226,66 @@ class Messager:
         self,
         student: Student,
         message: str,
-        retries: int
+        retries: int,
+        attempts: int = 0
     ):
-        max_retries = retries
         success = False
+        attempted = False
+        restarted = False
+        deferred = False
+        wait_for_slot = True
         while success is not True and retries > 0:
+            if wait_for_slot and not self.wait_for_send_slot():
+                break
+            wait_for_slot = True
+            attempted = True
+            self.phase = None
+            attempts += 1
             message_time = time.time()
-            logging.debug(f"Starting attempt {max_retries-retries+1} to send "
+            self.attempt_started()
+            logging.debug(f"Starting attempt {attempts} to send "
                           f"message to {student.student_id}...")
             try:
                 self.send_message_to_student(student, message)
                 success = True
                 self.messages_sent += 1
+                if self.config.ledger is not None:
+                    self.config.ledger.record(student.student_id)
             except Exception as e:
-                retries -= 1
                 self.times_failed += 1
+                failure = classify_failure(e, self.phase, self.get_current_url)
+                action = RECOVERY_ACTIONS[failure]
+                merge_stats_sections(self.stat_sections["failures"],
+                                     {failure: 1})
+                # A dead browser is not the student's fault, so the first
+                # restart does not use up one of their retries
+                if action == RESTART and not restarted:
+                    restarted = True
+                else:
+                    retries -= 1
                 logging.error(f"Error sending message to {student.student_id} "
                               f"({self.config.index})\n{e}"
+                              f"\n\tFailure: {failure}, recovery: {action}"
                               f"\n\tRemaining retries: "
                               f"{retries}")
 
             message_time = time.time() - message_time
-            sleep_time = self.config.get_rand_delay_time() - (message_time)
+            self.attempt_finished()
+            self.recycler.record(success, message_time)
+            self.pacer.record(success, message_time)
 
             self.update_time_running()
             self.update_message_conditions()
 
-            if sleep_time < 0:
-                sleep_time = 0
-            if success and not self.has_more_students:
-                sleep_time = 0
-            if not self.has_more_time:
-                sleep_time = 0
-            if success and not self.has_more_messages:
-                sleep_time = 0
-
             res = ""
             if success:
                 res += f"Message successfully sent to {student.student_id} " \
-                    f"({self.config.index}) after {max_retries-retries+1} " \
-                    f"attempt{'s' if max_retries-retries > 0 else ''}" \
+                    f"({self.config.index}) after {attempts} " \
+                    f"attempt{'s' if attempts > 1 else ''}" \
                     f"\n\tTook {message_time}s to send" \
                     f"\n\t{self.messages_sent} message" \
                     f"{'s' if self.messages_sent > 1 else ''} sent so far"
                 self.time_sending += message_time
-                if sleep_time > 0:
-                    res += f"\n\tWaiting {sleep_time}s before sending " \
-                        f"the next message..."
                 logging.debug(res)
                 print(Fore.GREEN + f"Message successfully sent to "
                       f"{student.student_id} ({self.config.index})"
@@ -174,101 +293,384 @@ class Messager:
             else:
                 res += f"Message failed to send to {student.student_id} " \
                     f"({self.config.index})\n\tTook {message_time}s to fail" \
-                    f"\n\t{max_retries-retries} times tried so far"
+                    f"\n\t{attempts} times tried so far"
                 self.time_retrying += message_time
-                if sleep_time > 0:
-                    res += f"\n\tWaiting {sleep_time}s before retrying..."
                 logging.warning(res)
                 print(Fore.RED + f"Message failed to send to "
                       f"{student.student_id} ({self.config.index})"
                       + Style.RESET_ALL)
+                if not self.recover(action, failure):
+                    break
+                # Students that may just need time are retried later in the
+                # run instead of holding up everyone after them
+                if action == RELOAD and retries > 0 and \
+                        self.config.deferred_retries:
+                    self.retry_queue.defer(student, self.row, retries,
+                                           attempts)
+                    deferred = True
+                    break
+                wait_for_slot = action not in (RETRY, RESTART)
             if not self.has_more_time:
                 break
-            time.sleep(sleep_time)
 
+        if not attempted or self.abort_reason is not None:
+            return None
+        if deferred:
+            return DEFERRED
         if not success:
             self.messages_failed += 1
         return success
 
+    # Carries out the recovery action for a failed attempt. Returns False if
+    # the run has to stop instead of retrying
+    def recover(self, action: str, failure: str):
+        if action == ABORT:
+            self.abort_reason = "Logged out of Handshake" \
+                if failure == AUTH_REDIRECT else f"Unrecoverable {failure}"
+            logging.error(f"Stopping: {self.abort_reason}")
+            print(Fore.RED + f"Stopping: {self.abort_reason}"
+                  + Style.RESET_ALL)
+            return False
+        if action == RESTART:
+            try:
+                self.reset_webdriver(relaunch=True)
+            except (WebDriverException, CdpError, OSError) as e:
+                self.abort_reason = "Could not restart Chrome"
+                logging.error(f"Stopping: {self.abort_reason}\n{e}")
+                print(Fore.RED + f"Stopping: {self.abort_reason}"
+                      + Style.RESET_ALL)
+                return False
+            self.recycler.reset()
+        return True
+
+    # Called around every send attempt, for the pool to see which sends
+    # overlap
+    def attempt_started(self):
+        pass
+
+    def attempt_finished(self):
+        pass
+
+    def get_current_url(self):
+        try:
+            return self.transport.get_url()
+        except Exception as e:
+            logging.debug(f"Could not read the current url\n{e}")
+            return None
+
+    # Blocks until the pacer's next send slot opens. Returns False if the
+    # run should stop instead of using the slot
+    def wait_for_send_slot(self):
+        sleep_time = self.pacer.reserve()
+        if sleep_time > 0:
+            logging.debug(f"Waiting {sleep_time}s before sending...")
+            time.sleep(sleep_time)
+        self.update_time_running()
+        self.update_message_conditions()
+        return self.has_more_time and self.has_more_messages
+
     def update_time_running(self):
         self.time_running = time.time() - self.start_time
 
+    def recycle_webdriver_if_needed(self):
+        reason = self.recycler.check(self.webdriver)
+        if reason is None:
+            return
+        message = f"Recycling webdriver (reason: {reason})..."
+        logging.info(message)
+        print(Fore.YELLOW + message + Style.RESET_ALL)
+        merge_stats_sections(self.stat_sections["recycle_reasons"],
+                             {reason: 1})
+        self.reset_webdriver()
+        self.recycler.reset()
+
+    # Opens a tab on the cdp, fake and record backends, or wraps the webdriver
+    # and starts the standby webdriver on the Selenium backend
+    def start_browser(self):
+        if self.config.browser is not None:
+            self.transport = self.config.browser.open_tab()
+        else:
+            self.transport = SeleniumTransport(self.webdriver, self.config)
+            self.start_standby()
+
+    def start_standby(self):
+        if self.config.standby_webdriver:
+            self.standby = WebdriverStandby(self.config, self.chrome_data_dir)
+
+    # `relaunch` is set when the session died, since a dead cdp tab usually
+    # means Chrome itself is gone and a new tab would die too
+    def reset_webdriver(self, relaunch: bool = False):
+        start = time.monotonic()
+        if self.config.browser is not None:
+            self.transport.close()
+            if relaunch and isinstance(self.transport, CdpTab):
+                self.config.browser.restart(self.transport.generation)
+            self.transport = self.config.browser.open_tab()
+        else:
+            if self.standby is None:
+                self.webdriver.quit()
+                self.webdriver = self.config.create_webdriver(
+                    self.chrome_data_dir)
+            else:
+                self.webdriver, self.chrome_data_dir = self.standby.swap(
+                    self.webdriver, self.chrome_data_dir)
+            self.transport = SeleniumTransport(self.webdriver, self.config)
+        stall = time.monotonic() - start
+        logging.info(f"Webdriver reset blocked sending for {stall}s")
+        merge_stats_sections(self.stat_sections["webdriver_resets"], {
+            "count": 1,
+            "stall_time": stall,
+            "max_stall": stall
+        })
+        self.wait = self.config.max_timeout
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+        if self.webdriver is not None:
+            self.webdriver.quit()
+        if self.standby is not None:
+            self.standby.close()
+            self.standby.remove_clone()
+
     def send_message_to_student(self, student: Student, message):
         parsed_message = self.parse_message(student, message)
 
-        self.open_student_page(student)
-        self.click_message_button()
+        if self.send_over_http(student, parsed_message):
+            return
 
-        # wait for modal to load
-        self.wait.until(
-            EC.visibility_of_element_located(
-                (By.ID, "modal-title")
-            )
+        self.open_message_modal(student)
+
+        # Only the Selenium backend has a WebDriver to type with, so the
+        # others always send with the script
+        if self.config.script_send or self.webdriver is None:
+            with self.time_phase("fill_and_send"):
+                self.fill_and_send(self.config.message_subject,
+                                   parsed_message)
+            return
+
+        with self.time_phase("subject"):
+            self.paste_subject(self.config.message_subject)
+        with self.time_phase("message"):
+            self.paste_message(parsed_message)
+        with self.time_phase("send"):
+            self.click_send()
+
+    # Sends the message with one http request when http_send is on. Returns
+    # False if it has to be sent through the browser instead
+    def send_over_http(self, student: Student, message: str):
+        sender = self.config.http_sender
+        if sender is None or not sender.enabled:
+            return False
+        start = time.monotonic()
+        try:
+            with self.time_phase("http_send"):
+                sender.send(student.student_id, self.config.message_subject,
+                            message, self.get_session_cookies)
+        except HttpSendError as e:
+            self.stat_sections["send_paths"]["http_fallbacks"] += 1
+            logging.warning(f"Could not send to {student.student_id} over "
+                            f"http, sending through the browser\n{e}")
+            return False
+        self.record_send_path("http", time.monotonic() - start)
+        return True
+
+    # Cookies Chrome sends to Handshake, which carry the logged in session
+    def get_session_cookies(self):
+        return self.transport.get_cookies([self.config.handshake_url])
+
+    # Records how long the steps inside the block took, if they succeed
+    @contextmanager
+    def time_phase(self, name: str):
+        self.phase = name
+        start = time.perf_counter()
+        yield
+        record_histogram(
+            self.stat_sections["phases"].setdefault(name, new_histogram()),
+            time.perf_counter() - start
         )
 
-        # time.sleep(1)
+    # Opens the message modal by going straight to the compose url when it
+    # is known, and through the student's profile page otherwise
+    def open_message_modal(self, student: Student):
+        compose_url = self.get_compose_url(student)
+        if compose_url is not None:
+            start = time.monotonic()
+            try:
+                with self.time_phase("page_load"):
+                    self.load_page(compose_url)
+                with self.time_phase("modal"):
+                    self.wait_for_modal()
+                self.record_send_path("direct", time.monotonic() - start)
+                self.direct_compose_failures = 0
+                return
+            except (WebDriverException, CdpError) as e:
+                self.stat_sections["send_paths"]["fallbacks"] += 1
+                self.direct_compose_failures += 1
+                logging.warning(f"Could not open the message modal at "
+                                f"{compose_url}, falling back to the profile "
+                                f"page\n{e}")
+                if self.direct_compose_failures >= DIRECT_COMPOSE_MAX_FAILURES:
+                    logging.warning("Direct compose urls keep failing, "
+                                    "using the profile page for the rest of "
+                                    "the run")
+
+        start = time.monotonic()
+        with self.time_phase("page_load"):
+            self.open_student_page(student)
+        with self.time_phase("message_button"):
+            self.click_message_button(student)
+        with self.time_phase("modal"):
+            self.wait_for_modal()
+        self.record_send_path("click", time.monotonic() - start)
+
+    def get_compose_url(self, student: Student):
+        if not self.config.direct_compose or self.config.compose_url is None:
+            return None
+        if self.direct_compose_failures >= DIRECT_COMPOSE_MAX_FAILURES:
+            return None
+        return self.config.compose_url.format(
+            handshake_url=self.config.handshake_url,
+            student_id=student.student_id
+        )
 
-        self.paste_subject(self.config.message_subject)
-        self.paste_message(parsed_message)
-        time.sleep(0.5)
-        self.click_send()
+    # Turns the message button's link into a compose url template the first
+    # time it is clicked, unless one is configured. Only the id in the
+    # /users/<id> path segment is replaced, since the same digits can also
+    # be part of a query string or another id in the link
+    def learn_compose_url(self, student: Student, href: str | None):
+        if self.config.compose_url is not None or href is None:
+            return
+        escaped_href = href.replace("{", "{{").replace("}", "}}")
+        compose_url, found = re.subn(
+            rf"/users/{student.student_id}(?=[/?#]|$)",
+            "/users/{student_id}",
+            escaped_href,
+            count=1
+        )
+        if found == 0:
+            return
+        self.config.compose_url = compose_url
+        logging.info(f"Learned compose url {self.config.compose_url}")
+
+    def record_send_path(self, path: str, path_time: float):
+        logging.debug(f"Opened message modal via {path} path in {path_time}s")
+        merge_stats_sections(self.stat_sections["send_paths"], {
+            path: {"count": 1, "time": path_time}
+        })
+
+    def wait_for_modal(self):
+        self.wait_for(
+            name="modal",
+            xpath=MODAL_TITLE_XPATH,
+            condition=EC.visibility_of_element_located
+        )
+
+    # Waits for the element at `xpath` and records how long it took. The
+    # transport waits with a MutationObserver in the page, unless event_waits
+    # is off on the Selenium backend, which polls with WebDriverWait instead
+    def wait_for(self, name: str, xpath: str, condition):
+        start = time.monotonic()
+        if self.webdriver is not None and not self.config.event_waits:
+            self.wait.until(condition((By.XPATH, xpath)))
+        elif not self.transport.wait_for(
+            xpath,
+            condition is not EC.presence_of_element_located,
+            self.config.max_timeout
+        ):
+            raise TimeoutException(f"Timed out waiting for {name}")
+        wait_time = time.monotonic() - start
+        logging.debug(f"Waited {wait_time}s for {name}")
+        record_histogram(
+            self.stat_sections["waits"].setdefault(name, new_histogram()),
+            wait_time
+        )
 
     def open_student_page(self, student: Student):
         url = f"{self.config.handshake_url}/users/{student.student_id}"
+        self.load_page(url)
+
+    def load_page(self, url: str):
         logging.debug(f"Opening {url}")
-        self.config.webdriver.get(url)
+        start = time.monotonic()
+        self.transport.navigate(url)
+        load_time = time.monotonic() - start
+        record_histogram(
+            self.stat_sections["page_loads"].setdefault(
+                self.config.get_page_load_mode(), new_histogram()),
+            load_time
+        )
 
     def parse_message(self, student: Student, message: str):
-        escaped_message = message.replace("\\{", "")
-        escaped_message = escaped_message.replace("\\}", "")
-        split_variables = escaped_message.split('{')
-
-        if len(split_variables) == 1:  # There are no variables
-            return message
-
-        variable_message = ""
-
-        for i in range(0, len(split_variables)):
-            if "}" in split_variables[i]:
-                split_variable = split_variables[i].split("}")
-                student_data = student.get_student_data(split_variable[0])
-                if student_data is not None:
-                    logging.debug(
-                        f"Replacing [{split_variable[0]}] with "
-                        f"\"{student_data}\"")
-                    variable_message += student_data
-                    variable_message += split_variable[1]
-                else:
-                    logging.warning(f"Student {student.student_id} does not "
-                                    f"have variable [{split_variable[0]}]")
-                    variable_message += split_variable[1]
-            else:
-                variable_message += split_variables[i]
-
-        return variable_message
+        template = self.config.message_template
+        if message != template.text:
+            template = MessageTemplate(message)
+        return template.render(student)
 
-    def click_message_button(self):
-        message_button = self.get_message_button()
+    def click_message_button(self, student: Student):
+        self.get_message_button()
         logging.debug("Found message button")
-        actions = ActionChains(self.config.webdriver)
-        actions.move_to_element(message_button).perform()
-        logging.debug("Scrolled to message button")
-        message_button.click()
+        if self.config.direct_compose:
+            self.learn_compose_url(student, self.transport.get_attribute(
+                MESSAGE_BUTTON_XPATH, "href"))
+        self.transport.click(MESSAGE_BUTTON_XPATH)
         logging.debug("Clicked message button")
 
     def get_message_button(self):
-        button = self.wait.until(
-            EC.element_to_be_clickable(
-                (By.XPATH, '//a[contains(@href,"send-message")]')
-            )
+        self.wait_for(
+            name="message_button",
+            xpath=MESSAGE_BUTTON_XPATH,
+            condition=EC.element_to_be_clickable
         )
-        return button
 
     def paste_message(self, message):
-        actions = ActionChains(self.config.webdriver)
+        actions = ActionChains(self.webdriver)
         actions.click(self.get_subject_field()).perform()
         actions.send_keys(Keys.TAB).perform()
+        if self.config.fast_text_entry and self.insert_message(message):
+            return
         actions.send_keys(message).perform()
+        # Give the message box time to catch up with the typed keys so the
+        # message is not sent half typed
+        time.sleep(0.5)
+
+    # Inserts the whole message into the focused message box in one
+    # operation, then checks the box holds exactly the message. Clears the
+    # box and returns False if it does not
+    def insert_message(self, message):
+        self.webdriver.execute_cdp_cmd("Input.insertText", {"text": message})
+        expected = normalize_text(message)
+        try:
+            WebDriverWait(
+                driver=self.webdriver,
+                timeout=TEXT_ENTRY_TIMEOUT,
+                poll_frequency=0.05
+            ).until(
+                lambda driver: normalize_text(
+                    driver.execute_script(GET_FOCUSED_TEXT)) == expected
+            )
+            logging.debug("Inserted message")
+            return True
+        except TimeoutException:
+            logging.warning("Message box did not match the message after "
+                            "inserting it, typing it instead")
+            actions = ActionChains(self.webdriver)
+            actions.key_down(Keys.CONTROL).send_keys("a")
+            actions.key_up(Keys.CONTROL).send_keys(Keys.BACKSPACE).perform()
+            return False
+
+    # Fills in the subject and message and clicks send with one script
+    # instead of a WebDriver command per step
+    def fill_and_send(self, subject, message):
+        result = self.transport.fill_and_send(
+            subject or "", message, self.config.max_timeout)
+        logging.debug(f"Fill and send script result: {result}")
+        if result.get("missing") is not None:
+            raise NoSuchElementException(
+                f"Could not find the message modal's {result['missing']}")
+        if not result.get("ok"):
+            raise WebDriverException(
+                f"Could not fill in the message modal: {result.get('error')}")
 
     def paste_subject(self, subject):
         if subject is None or subject == "":
@@ -280,21 +682,27 @@ class Messager:
         logging.debug(f"Pasted subject {subject}")
 
     def get_subject_field(self):
-        return self.config.webdriver.find_element(
+        return self.webdriver.find_element(
             By.ID,
             "message-modal-subject"
         )
 
     def click_send(self):
-        self.get_send_button().click()
+        self.get_send_button()
+        self.transport.click(SEND_BUTTON_XPATH)
 
     def get_send_button(self):
-        return self.config.webdriver.find_element(
-            By.XPATH,
-            "//a[contains(@data-bind, 'click: createConversation')]"
+        self.wait_for(
+            name="send_button",
+            xpath=SEND_BUTTON_XPATH,
+            condition=EC.presence_of_element_located
         )
 
-    def update_stats(self):
+    # Writes a snapshot of every stat to the stats file and empties the
+    # journal
+    def update_stats(self, current_position: int | None = None):
+        if current_position is None:
+            current_position = self.get_current_position()
         stats = {
             "time_running": self.time_running,
             "messages_sent": self.messages_sent,
@@ -302,16 +710,57 @@ class Messager:
             "times_failed": self.times_failed,
             "time_sending": self.time_sending,
             "time_retrying": self.time_retrying,
-            "current_position": self.config.index,
+            "current_position": current_position,
+            "journal_seq": self.journal.seq,
+            **self.stat_sections,
+        }
+        write_stats_file(stats, self.config.get_stats_file())
+        self.journal.truncate()
+        self.journaled = copy.deepcopy(self.get_counters())
+
+    # Appends what changed since the last record to the journal
+    def record_progress(self, current_position: int | None = None):
+        if current_position is None:
+            current_position = self.get_current_position()
+        counters = self.get_counters()
+        self.journal.append(
+            position=current_position,
+            time_running=self.time_running,
+            delta=diff_stats_sections(counters, self.journaled)
+        )
+        self.journaled = copy.deepcopy(counters)
+        if self.journal.records >= COMPACT_RECORDS:
+            self.update_stats(current_position)
+
+    # Resume point: the next row, or the first deferred student's row if it
+    # comes before it
+    def get_current_position(self):
+        return min(self.retry_queue.rows() | {self.config.index})
+
+    # Stats that add up across records, unlike the time running and position
+    def get_counters(self):
+        return {
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+            "times_failed": self.times_failed,
+            "time_sending": self.time_sending,
+            "time_retrying": self.time_retrying,
+            **self.stat_sections,
         }
-        with open("stats.json", "w") as f:
-            f.write(json.dumps(stats, indent=4))
-            f.close()
 
     def load_stats(self):
+        stats_file = self.config.get_stats_file()
         (self.time_running, self.messages_sent, self.messages_failed,
          self.times_failed, self.time_sending, self.time_retrying,
-         self.config.index) = get_stats()
+         self.config.index) = get_stats(stats_file)
+        self.stat_sections = get_stats_sections(stats_file)
+        self.journal = StatsJournal(
+            seq=load_stats_file(stats_file).get("journal_seq", 0),
+            sync_interval=self.config.journal_sync_interval,
+            path=get_journal_path(stats_file)
+        )
+        # Fold in anything a stopped run left in the journal
+        self.update_stats()
 
     @property
     def wait(self) -> WebDriverWait:
@@ -320,8 +769,9 @@ class Messager:
     @wait.setter
     def wait(self, timeout: int):
         self._wait = WebDriverWait(
-            driver=self.config.webdriver,
-            timeout=timeout)
+            driver=self.webdriver,
+            timeout=timeout,
+            poll_frequency=self.config.wait_poll_interval)
 
     @property
     def time_running(self) -> float:
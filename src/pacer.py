@@ -0,0 +1,87 @@
+import logging
+import random
+import threading
+import time
+
+# A send taking this many times longer than usual counts as a latency spike
+LATENCY_SPIKE_FACTOR = 2.0
+# Weight of the newest send in the usual send time
+LATENCY_SMOOTHING = 0.2
+
+
+class Pacer:
+    """Hands out send slots spaced by the configured delay.
+
+    A single pacer is shared by everything sending from the same Handshake
+    account, so the `min_delay`/`random_delay` budget holds no matter how many
+    browsers are sending at once.
+
+    With `adaptive_pacing` the delay between slots is adjusted from how sends
+    are going: every quick success takes `pacing_step` seconds off it, down
+    to `pacing_floor`, and every failure or latency spike multiplies it by
+    `pacing_backoff`, up to `pacing_ceiling`. `random_delay` is still added
+    on top of it.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+        self.floor = config.pacing_floor
+        if self.floor is None:
+            self.floor = config.min_delay
+        self.ceiling = max(config.pacing_ceiling, self.floor)
+        self.delay = min(max(config.min_delay, self.floor), self.ceiling)
+        self.usual_send_time = None
+
+    def reserve(self) -> float:
+        """Reserve the next send slot and return the seconds until it opens."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot)
+            self.next_slot = start + self.get_delay_time()
+        wait_time = start - now
+        logging.debug(f"Reserved send slot in {wait_time}s")
+        return wait_time
+
+    def get_delay_time(self):
+        if not self.config.adaptive_pacing:
+            return self.config.get_rand_delay_time()
+        delay = self.delay + random.randint(0, self.config.random_delay)
+        logging.debug(f"Adaptive delay time: {delay}s")
+        return delay
+
+    def record(self, success: bool, send_time: float):
+        if not self.config.adaptive_pacing:
+            return
+        with self.lock:
+            if not success:
+                self.back_off("send failed")
+                return
+            usual = self.usual_send_time
+            if usual is not None and send_time >= usual * LATENCY_SPIKE_FACTOR:
+                self.back_off(f"send took {send_time:.2f}s, usually "
+                              f"{usual:.2f}s")
+            elif self.delay > self.floor:
+                self.set_delay(self.delay - self.config.pacing_step,
+                               f"sent in {send_time:.2f}s")
+            if usual is None:
+                self.usual_send_time = send_time
+            else:
+                self.usual_send_time = usual + LATENCY_SMOOTHING * (
+                    send_time - usual)
+
+    def back_off(self, reason: str):
+        self.set_delay(self.delay * self.config.pacing_backoff, reason)
+        # Slots already handed out keep their time, but the next one waits
+        # out the longer delay
+        self.next_slot = max(self.next_slot, time.monotonic() + self.delay)
+
+    def set_delay(self, delay: float, reason: str):
+        delay = min(max(delay, self.floor), self.ceiling)
+        if delay == self.delay:
+            return
+        change = "raised" if delay > self.delay else "lowered"
+        logging.info(f"Pacing delay {change} from {self.delay:.2f}s to "
+                     f"{delay:.2f}s ({reason})")
+        self.delay = delay
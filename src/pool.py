@@ -0,0 +1,226 @@
+import logging
+import shutil
+import threading
+import time
+
+from colorama import Fore, Style
+
+from src.messager import Messager
+from src.utils import clone_chrome_data_dir, merge_stats_sections, \
+    new_stats_sections
+
+
+class MessagerPool:
+    """Sends with `pool_size` Chrome sessions pulling from one student queue.
+
+    The messager that owns the pool keeps the run totals. Workers report the
+    stats of each finished student back to it, and all of them share its
+    pacer so the configured delay applies to the pool as a whole.
+    """
+
+    def __init__(self, messager: Messager):
+        self.messager = messager
+        self.config = messager.config
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        self.aborted = set()
+        # Workers in the middle of a send attempt, and when that last changed
+        self.sending = 0
+        self.sending_changed = time.time()
+
+    # Returns the resume position. The index is left where the roster got to,
+    # since the roster can only be read forward
+    def run(self):
+        message = f"Starting {self.config.pool_size} messaging workers..."
+        logging.info(message)
+        print(Fore.YELLOW + message + Style.RESET_ALL)
+
+        # The first worker drives the browser the config already launched
+        workers = [PoolWorker(
+            pool=self,
+            worker_id=0,
+            webdriver=self.messager.webdriver,
+            chrome_data_dir=self.config.chrome_data_dir
+        )]
+        for worker_id in range(1, self.config.pool_size):
+            workers.append(PoolWorker(pool=self, worker_id=worker_id))
+
+        threads = [
+            threading.Thread(target=worker.run,
+                             name=f"worker-{worker.worker_id}")
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.messager.update_time_running()
+        self.messager.update_message_conditions()
+        return self.get_current_position()
+
+    # Returns the next student, their row, the attempts they have left and
+    # the attempts already made, preferring deferred students whose backoff
+    # is over
+    def next_student(self):
+        retry_queue = self.messager.retry_queue
+        while True:
+            with self.lock:
+                self.messager.update_time_running()
+                self.messager.update_message_conditions()
+                if self.messager.abort_reason is not None or not (
+                        self.messager.has_more_time and
+                        self.messager.has_more_messages):
+                    return -1, None, None, None
+                # Count students still being sent to against max_messages so
+                # the pool cannot overshoot it
+                if (
+                    self.config.max_messages != -1
+                ) and (
+                    self.messager.messages_sent + len(self.in_flight) >=
+                    self.config.max_messages
+                ):
+                    return -1, None, None, None
+                deferred = retry_queue.pop_ready()
+                if deferred is not None:
+                    self.in_flight.add(deferred.row)
+                    return deferred.student, deferred.row, \
+                        deferred.retries, deferred.attempts
+                student = self.config.get_next_student()
+                if student != -1:
+                    row = self.config.index - 1
+                    self.in_flight.add(row)
+                    return student, row, self.config.max_retries, 0
+                if len(retry_queue) == 0:
+                    return -1, None, None, None
+                sleep_time = retry_queue.wait_time()
+            # Out of new students, so wait for the next deferred one
+            time.sleep(min(sleep_time, 1))
+
+    def finish_student(self, worker: "PoolWorker", row: int,
+                       send_success: bool | str | None):
+        with self.lock:
+            self.in_flight.discard(row)
+            # Deferred rows are held by the retry queue until they finish
+            if send_success is None:
+                self.aborted.add(row)
+            if worker.abort_reason is not None:
+                self.messager.abort_reason = worker.abort_reason
+
+            self.messager.messages_sent += worker.messages_sent
+            self.messager.messages_failed += worker.messages_failed
+            self.messager.times_failed += worker.times_failed
+            self.messager.time_sending += worker.time_sending
+            self.messager.time_retrying += worker.time_retrying
+            merge_stats_sections(self.messager.stat_sections,
+                                 worker.stat_sections)
+            worker.reset_counters()
+
+            self.messager.update_time_running()
+            self.messager.record_progress(self.get_current_position())
+
+    # Adds up the time more than one worker was sending, so the report can
+    # take it back out of the summed send times to find the time waited
+    def track_sending(self, change: int):
+        with self.lock:
+            now = time.time()
+            if self.sending > 1:
+                self.messager.stat_sections["pool"]["overlap_time"] += \
+                    (now - self.sending_changed) * (self.sending - 1)
+            self.sending += change
+            self.sending_changed = now
+
+    # Resume point: the first row that is not finished yet. Workers finish
+    # out of order, so up to pool_size - 1 rows after it may already be sent
+    def get_current_position(self):
+        pending = self.in_flight | self.aborted | \
+            self.messager.retry_queue.rows()
+        if len(pending) > 0:
+            return min(pending)
+        return self.config.index
+
+
+class PoolWorker(Messager):
+    # Shares the pool's config and pacer instead of loading its own
+    def __init__(self, pool: MessagerPool, worker_id: int, webdriver=None,
+                 chrome_data_dir: str | None = None):
+        self.init_session(pool.config, webdriver, chrome_data_dir)
+        self.pool = pool
+        self.pacer = pool.messager.pacer
+        self.retry_queue = pool.messager.retry_queue
+        self.worker_id = worker_id
+        self.profile_clone = None
+        self.time_running = pool.messager.time_running
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.times_failed = 0
+        self.time_sending = 0.0
+        self.time_retrying = 0.0
+        self.stat_sections = new_stats_sections()
+
+    def run(self):
+        try:
+            # Workers on the cdp backend are tabs in the one Chrome process
+            if self.config.browser is None and self.webdriver is None:
+                self.profile_clone = clone_chrome_data_dir(
+                    self.config.chrome_data_dir)
+                self.chrome_data_dir = self.profile_clone
+                self.webdriver = self.config.create_webdriver(
+                    self.chrome_data_dir)
+            self.start_browser()
+
+            while True:
+                student, self.row, retries, attempts = \
+                    self.pool.next_student()
+                if student == -1:
+                    logging.debug(f"Worker {self.worker_id} has no more "
+                                  f"students to message")
+                    break
+                self.recycle_webdriver_if_needed()
+
+                send_success = self.send_message_with_retry(
+                    student=student,
+                    message=self.config.message,
+                    retries=retries,
+                    attempts=attempts
+                )
+                self.pool.finish_student(self, self.row, send_success)
+        except Exception as e:
+            logging.error(f"Worker {self.worker_id} stopped unexpectedly\n{e}")
+        finally:
+            self.close()
+
+    def attempt_started(self):
+        self.pool.track_sending(1)
+
+    def attempt_finished(self):
+        self.pool.track_sending(-1)
+
+    def update_time_running(self):
+        self.pool.messager.update_time_running()
+        self.time_running = self.pool.messager.time_running
+
+    def update_message_conditions(self):
+        # The roster is only read under the pool lock, so reuse the owning
+        # messager's view of it
+        messager = self.pool.messager
+        self.has_more_students = messager.has_more_students
+        self.has_more_time = (
+            self.config.max_time == -1
+        ) or (
+            messager.time_running < self.config.max_time
+        )
+        self.has_more_messages = (
+            self.config.max_messages == -1
+        ) or (
+            messager.messages_sent + self.messages_sent <
+            self.config.max_messages
+        )
+
+    def close(self):
+        super().close()
+        if self.profile_clone is not None:
+            shutil.rmtree(self.profile_clone, ignore_errors=True)
@@ -0,0 +1,105 @@
+import logging
+from collections import deque
+
+MEMORY = "memory"
+LATENCY = "latency"
+ERRORS = "errors"
+
+
+class WebdriverRecycler:
+    """Decides when a webdriver has degraded enough to be worth restarting.
+
+    Tracks one browser session at a time: the resident memory of Chrome and
+    its child processes, how far recent send times have drifted above the
+    session's first sends, and the recent failure rate. Call `reset` after
+    replacing the webdriver so the new session gets a fresh baseline.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        window = self.config.recycle_window
+        self.baseline = []
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        # Whether memory has been measured since the reset. A Chrome already
+        # over the limit on its first check is kept, since a restart would
+        # not bring it under
+        self.memory_checked = False
+        self.memory_check_enabled = True
+
+    def record(self, success: bool, send_time: float):
+        self.outcomes.append(success)
+        if not success:
+            return
+        if len(self.baseline) < self.config.recycle_window:
+            self.baseline.append(send_time)
+        else:
+            self.latencies.append(send_time)
+
+    def check(self, webdriver) -> str | None:
+        """Return why the webdriver should be recycled, or None to keep it."""
+        window = self.config.recycle_window
+
+        max_error_rate = self.config.recycle_max_error_rate
+        if max_error_rate != -1 and len(self.outcomes) == window:
+            error_rate = self.outcomes.count(False) / window
+            if error_rate >= max_error_rate:
+                logging.info(f"Webdriver error rate {error_rate} reached "
+                             f"{max_error_rate}")
+                return ERRORS
+
+        max_drift = self.config.recycle_max_latency_drift
+        if max_drift != -1 and len(self.latencies) == window:
+            baseline = sum(self.baseline) / len(self.baseline)
+            recent = sum(self.latencies) / len(self.latencies)
+            if baseline > 0 and recent / baseline >= max_drift:
+                logging.info(f"Average send time drifted from {baseline}s "
+                             f"to {recent}s")
+                return LATENCY
+
+        max_memory = self.config.recycle_max_memory_mb
+        # The fake and record backends have no Chrome to measure. Memory is
+        # only checked once a window of sends has been made since the reset,
+        # like the other checks, so a new Chrome is not recycled straight away
+        if max_memory != -1 and webdriver is not None and \
+                self.memory_check_enabled and len(self.outcomes) == window:
+            memory = get_chrome_memory_mb(webdriver)
+            first_check = not self.memory_checked
+            self.memory_checked = True
+            if memory is not None and memory >= max_memory:
+                if first_check:
+                    logging.warning(
+                        f"A new Chrome session is already using {memory}MB "
+                        f"of memory, over recycle_max_memory_mb "
+                        f"({max_memory}MB). Not recycling it for memory")
+                    self.memory_check_enabled = False
+                    return None
+                logging.info(f"Chrome is using {memory}MB of memory")
+                return MEMORY
+
+        return None
+
+
+def get_chrome_memory_mb(webdriver) -> float | None:
+    """Resident memory of chromedriver and every Chrome process under it."""
+    try:
+        import psutil
+    except ImportError:
+        logging.debug("psutil is not installed, skipping memory check")
+        return None
+    try:
+        driver_process = psutil.Process(webdriver.service.process.pid)
+        processes = [driver_process] + driver_process.children(recursive=True)
+        rss = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+    except (AttributeError, psutil.Error) as e:
+        logging.debug(f"Could not read Chrome memory usage\n{e}")
+        return None
+    return rss / (1024 * 1024)
@@ -0,0 +1,74 @@
+import heapq
+import logging
+import threading
+import time
+
+from src.types.student import Student
+
+# Returned by send_message_with_retry when the student was deferred
+DEFERRED = "deferred"
+
+
+class DeferredStudent:
+    __slots__ = ("student", "row", "retries", "attempts")
+
+    def __init__(self, student: Student, row: int, retries: int,
+                 attempts: int):
+        self.student = student
+        self.row = row
+        # Attempts the student has left
+        self.retries = retries
+        # Attempts made so far, which can be more than the retries used up
+        # since a restart does not use one
+        self.attempts = attempts
+
+
+class RetryQueue:
+    """Students whose send failed, set aside to be retried later in the run.
+
+    Each student waits `retry_backoff` seconds after their first failure,
+    doubling with every failure after that, while other students are sent
+    to. Students are ordered by when they are ready, and the rows they came
+    from are kept so the resume position never skips over one.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.heap = []
+        # Breaks ties between students ready at the same time
+        self.pushed = 0
+
+    def defer(self, student: Student, row: int, retries: int,
+              attempts: int):
+        delay = self.config.retry_backoff * 2 ** (max(attempts, 1) - 1)
+        self.push(DeferredStudent(student, row, retries, attempts), delay)
+        logging.info(f"Deferred {student.student_id} ({row}) for {delay}s "
+                     f"after {attempts} attempt{'s' if attempts > 1 else ''} "
+                     f"with {retries} retries left")
+
+    def push(self, deferred: DeferredStudent, delay: float = 0):
+        with self.lock:
+            self.pushed += 1
+            heapq.heappush(
+                self.heap, (time.monotonic() + delay, self.pushed, deferred))
+
+    def pop_ready(self) -> DeferredStudent | None:
+        with self.lock:
+            if len(self.heap) == 0 or self.heap[0][0] > time.monotonic():
+                return None
+            return heapq.heappop(self.heap)[2]
+
+    # Seconds until the next student is ready to retry
+    def wait_time(self) -> float:
+        with self.lock:
+            if len(self.heap) == 0:
+                return 0
+            return max(self.heap[0][0] - time.monotonic(), 0)
+
+    def rows(self) -> set[int]:
+        with self.lock:
+            return {deferred.row for _, _, deferred in self.heap}
+
+    def __len__(self):
+        return len(self.heap)
@@ -0,0 +1,91 @@
+import csv
+import logging
+import sys
+from itertools import islice, zip_longest
+from typing import Callable
+
+from src.types.student import Student
+
+CHUNK_SIZE = 1000
+
+
+class Roster:
+    """Students streamed from the student CSV as they are needed.
+
+    Rows are read `chunk_size` at a time and stored as one array per column,
+    which students index into by row. Only the current chunk is kept, so
+    memory stays bounded no matter how long the file is. Access is forward
+    only: asking for a row skips every row before it without building
+    students for them, which is how resuming works.
+    """
+
+    def __init__(self, path: str,
+                 verify_student_id: Callable[[str | None, int], int],
+                 chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.verify_student_id = verify_student_id
+        self.chunk_size = chunk_size
+        self.file = open(path, newline="", encoding="utf-8-sig")
+        self.reader = csv.reader(self.file)
+        self.columns = next(self.reader, [])
+        self.chunk = {}
+        # Row number of the first row in the chunk
+        self.chunk_start = 0
+        self.chunk_length = 0
+        self.exhausted = False
+
+    def has_row(self, row: int) -> bool:
+        self.seek(row)
+        return row < self.chunk_start + self.chunk_length
+
+    def get(self, row: int) -> Student:
+        if not self.has_row(row):
+            raise IndexError(f"{self.path} has no row {row}")
+        index = row - self.chunk_start
+        student_id = None
+        if "handshake_id" in self.chunk:
+            student_id = self.chunk["handshake_id"][index]
+        return Student(
+            student_id=self.verify_student_id(student_id, row),
+            columns=self.chunk,
+            row=index
+        )
+
+    # Reads forward until `row` is in the chunk or the file runs out
+    def seek(self, row: int):
+        if row < self.chunk_start:
+            raise IndexError(f"Row {row} of {self.path} was already read")
+        while row >= self.chunk_start + self.chunk_length and \
+                not self.exhausted:
+            # Skip whole rows before `row` without storing them
+            self.chunk_start += self.chunk_length
+            skip = row - self.chunk_start
+            skipped = sum(1 for _ in islice(self.reader, skip))
+            self.chunk_start += skipped
+            if skipped < skip:
+                self.chunk = {}
+                self.chunk_length = 0
+                self.close()
+                break
+            self.read_chunk()
+
+    def read_chunk(self):
+        rows = list(islice(self.reader, self.chunk_size))
+        if len(rows) < self.chunk_size:
+            self.close()
+        # Short rows are padded with empty cells and extra cells dropped.
+        # Interning means a value repeated down a column (school, major,
+        # class year, ...) is stored once instead of once per row
+        width = len(self.columns)
+        values = zip_longest(*rows, fillvalue="")
+        self.chunk = {
+            name: tuple(map(sys.intern, column))
+            for name, column in zip(self.columns, islice(values, width))
+        }
+        self.chunk_length = len(rows)
+        logging.debug(f"Read rows {self.chunk_start}-"
+                      f"{self.chunk_start + self.chunk_length} of {self.path}")
+
+    def close(self):
+        self.exhausted = True
+        self.file.close()
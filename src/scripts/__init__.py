@@ -0,0 +1,22 @@
+import json
+import os
+
+
+def load_script(name: str):
+    path = os.path.join(os.path.dirname(__file__), name)
+    with open(path) as script:
+        return script.read()
+
+
+# Wraps a script written for WebDriver's execute_async_script, which reads
+# its arguments and callback from `arguments`, into an expression that
+# evaluates to a promise of the value it calls back with
+def to_promise_expression(script: str, *args):
+    return (
+        f"new Promise((done) => (function () {{\n{script}\n}})"
+        f".apply(null, {json.dumps(list(args))}.concat([done])))"
+    )
+
+
+FILL_AND_SEND_SCRIPT = load_script("fill_and_send.js")
+WAIT_FOR_ELEMENT_SCRIPT = load_script("wait_for_element.js")
@@ -0,0 +1,64 @@
+// Fills in the open message modal and sends it in one WebDriver round trip.
+// Arguments: subject (empty string keeps Handshake's default), message,
+// timeout in milliseconds, and the async script callback.
+// Resolves with {ok, missing, error, timing}, where timing holds the
+// milliseconds since the script started at the end of each step.
+const [subject, message, timeout, done] = arguments;
+const start = performance.now();
+const timing = {};
+const mark = (step) => { timing[step] = performance.now() - start; };
+const finish = (result) => done(Object.assign({ok: false}, result, {timing}));
+
+const normalize = (text) => text === null || text === undefined ? null :
+    text.replace(/\r\n/g, "\n").replace(/\u00a0/g, " ").trim();
+
+const find = {
+    subject: () => document.getElementById("message-modal-subject"),
+    send_button: () => document.evaluate(
+        "//a[contains(@data-bind, 'click: createConversation')]",
+        document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue,
+    body: () => {
+        const subjectField = find.subject();
+        const modal = subjectField && subjectField.closest(
+            "[role='dialog'], .modal, form") || document;
+        return modal.querySelector("[contenteditable='true'], textarea");
+    },
+};
+
+function waitFor(name, callback) {
+    const element = find[name]();
+    if (element) {
+        mark(name);
+        callback(element);
+    } else if (performance.now() - start > timeout) {
+        finish({missing: name});
+    } else {
+        setTimeout(() => waitFor(name, callback), 50);
+    }
+}
+
+waitFor("send_button", (sendButton) => {
+    waitFor("subject", (subjectField) => {
+        if (subject !== "") {
+            const setValue = Object.getOwnPropertyDescriptor(
+                HTMLInputElement.prototype, "value").set;
+            setValue.call(subjectField, subject);
+            subjectField.dispatchEvent(new Event("input", {bubbles: true}));
+            subjectField.dispatchEvent(new Event("change", {bubbles: true}));
+        }
+        waitFor("body", (body) => {
+            body.focus();
+            document.execCommand("insertText", false, message);
+            const text = body.value !== undefined ? body.value : body.innerText;
+            if (normalize(text) !== normalize(message)) {
+                finish({error: "body_mismatch"});
+                return;
+            }
+            mark("insert");
+            sendButton.click();
+            mark("send");
+            finish({ok: true});
+        });
+    });
+});
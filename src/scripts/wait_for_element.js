@@ -0,0 +1,48 @@
+// Resolves as soon as an element matching an XPath is in the page (and
+// visible, if asked), using a MutationObserver instead of polling.
+// Arguments: xpath, whether the element must be visible, timeout in
+// milliseconds, and the async script callback.
+// Resolves with true once the element is found, or false on timeout.
+const [xpath, visible, timeout, done] = arguments;
+
+const isReady = () => {
+    const element = document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    if (element === null) {
+        return false;
+    }
+    if (!visible) {
+        return true;
+    }
+    const style = window.getComputedStyle(element);
+    return element.getClientRects().length > 0 &&
+        style.visibility !== "hidden" && style.display !== "none";
+};
+
+if (isReady()) {
+    done(true);
+} else {
+    let finished = false;
+    const finish = (found) => {
+        if (finished) {
+            return;
+        }
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        done(found);
+    };
+    const observer = new MutationObserver(() => {
+        if (isReady()) {
+            finish(true);
+        }
+    });
+    observer.observe(document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ["class", "style", "hidden", "href", "data-bind"],
+    });
+    const timer = setTimeout(() => finish(false), timeout);
+}
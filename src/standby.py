@@ -0,0 +1,75 @@
+import logging
+import shutil
+import threading
+
+from src.utils import clone_chrome_data_dir
+
+
+class WebdriverStandby:
+    """Keeps a spare webdriver launched in the background for instant resets.
+
+    Chrome will not open two sessions on one user data directory, so the
+    spare runs on a clone of it. Each swap hands over the spare and, on a
+    background thread, quits the old webdriver and launches the next spare
+    on the directory it frees up.
+    """
+
+    def __init__(self, config, chrome_data_dir: str):
+        self.config = config
+        self.chrome_data_dir = chrome_data_dir
+        self.clone_dir = None
+        self.spare = None
+        self.spare_dir = None
+        self.thread = None
+        self.start(old_webdriver=None)
+
+    def start(self, old_webdriver):
+        self.thread = threading.Thread(
+            target=self.prepare,
+            args=(old_webdriver,),
+            name="webdriver-standby",
+            daemon=True
+        )
+        self.thread.start()
+
+    def prepare(self, old_webdriver):
+        if old_webdriver is not None:
+            try:
+                old_webdriver.quit()
+            except Exception as e:
+                logging.warning(f"Could not quit old webdriver\n{e}")
+        try:
+            if self.spare_dir is None:
+                self.clone_dir = clone_chrome_data_dir(self.chrome_data_dir)
+                self.spare_dir = self.clone_dir
+            self.spare = self.config.create_webdriver(self.spare_dir)
+            logging.debug(f"Standby webdriver ready ({self.spare_dir})")
+        except Exception as e:
+            self.spare = None
+            logging.error(f"Could not launch standby webdriver\n{e}")
+
+    def swap(self, webdriver, chrome_data_dir: str):
+        """Return the spare webdriver and its data dir in place of the given
+        ones, falling back to a normal restart if the spare failed to launch.
+        """
+        self.thread.join()
+        if self.spare is None:
+            webdriver.quit()
+            webdriver = self.config.create_webdriver(chrome_data_dir)
+            self.start(old_webdriver=None)
+            return webdriver, chrome_data_dir
+        spare, spare_dir = self.spare, self.spare_dir
+        self.spare = None
+        self.spare_dir = chrome_data_dir
+        self.start(old_webdriver=webdriver)
+        return spare, spare_dir
+
+    def close(self):
+        self.thread.join()
+        if self.spare is not None:
+            self.spare.quit()
+            self.spare = None
+
+    def remove_clone(self):
+        if self.clone_dir is not None:
+            shutil.rmtree(self.clone_dir, ignore_errors=True)
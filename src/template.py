@@ -0,0 +1,87 @@
+import logging
+
+from src.types.student import Student
+
+LITERAL = "literal"
+VARIABLE = "variable"
+ESCAPED = "escaped"
+
+ESCAPES = {
+    "{{": "{",
+    "}}": "}",
+    "\\{": "{",
+    "\\}": "}",
+}
+
+
+class MessageTemplate:
+    """A `message.txt` body compiled once into literal and variable segments.
+
+    `{name}` is replaced with the student's `name` column. `{{`, `}}`, `\\{`
+    and `\\}` are sent as plain braces. Rendering only looks up each variable
+    once and formats the precompiled text, so it is never re-parsed.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.segments = self.compile(text)
+
+        # Each variable is looked up once per student, then the values are
+        # dropped into a format string built from the segments
+        self.variables = list(dict.fromkeys(
+            value for kind, value in self.segments if kind == VARIABLE
+        ))
+        positions = {name: i for i, name in enumerate(self.variables)}
+        self.format = "".join(
+            f"{{{positions[value]}}}" if kind == VARIABLE
+            else value.replace("{", "{{").replace("}", "}}")
+            for kind, value in self.segments
+        )
+
+    @staticmethod
+    def compile(text: str) -> list[tuple[str, str]]:
+        segments = []
+        literal_start = 0
+        i = 0
+        while i < len(text):
+            pair = text[i:i + 2]
+            if pair in ESCAPES:
+                if literal_start < i:
+                    segments.append((LITERAL, text[literal_start:i]))
+                segments.append((ESCAPED, ESCAPES[pair]))
+                i += 2
+                literal_start = i
+            elif text[i] == "{":
+                end = text.find("}", i + 1)
+                if end in (-1, i + 1) or "{" in text[i + 1:end]:
+                    # Not a variable, so send the brace as written
+                    i += 1
+                    continue
+                if literal_start < i:
+                    segments.append((LITERAL, text[literal_start:i]))
+                segments.append((VARIABLE, text[i + 1:end]))
+                i = end + 1
+                literal_start = i
+            else:
+                i += 1
+        if literal_start < len(text):
+            segments.append((LITERAL, text[literal_start:]))
+        return segments
+
+    def validate(self, columns: list[str]) -> list[str]:
+        """Return the template variables that are not columns of the CSV."""
+        return [name for name in self.variables if name not in columns]
+
+    def render(self, student: Student) -> str:
+        values = []
+        for name in self.variables:
+            value = student.get_student_data(name)
+            if value is None or value == "":
+                logging.warning(f"Student {student.student_id} does not "
+                                f"have variable [{name}]")
+                value = ""
+            values.append(value)
+        return self.format.format(*values)
+
+    def render_all(self, students: list[Student]) -> list[str]:
+        return [self.render(student) for student in students]
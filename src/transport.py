@@ -0,0 +1,178 @@
+import json
+import logging
+import random
+import threading
+import time
+
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.by import By
+
+from src.scripts import FILL_AND_SEND_SCRIPT, WAIT_FOR_ELEMENT_SCRIPT
+
+
+class Transport:
+    """What the messager needs from a page to send a message.
+
+    One transport drives one page. The Selenium backend wraps its webdriver
+    in a SeleniumTransport and the cdp backend's tabs are CdpTabs. The fake
+    and record backends send nothing, so the messager's own overhead can be
+    measured without a browser.
+    """
+
+    def navigate(self, url: str):
+        raise NotImplementedError
+
+    def wait_for(self, xpath: str, visible: bool, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the element at `xpath` to be on
+        the page, and visible if `visible`. Return whether it was.
+        """
+        raise NotImplementedError
+
+    def click(self, xpath: str):
+        raise NotImplementedError
+
+    def get_attribute(self, xpath: str, name: str) -> str | None:
+        raise NotImplementedError
+
+    def fill_and_send(self, subject: str, message: str,
+                      timeout: float) -> dict:
+        """Fill in and send the open message window. Returns the result of
+        the fill and send script: `ok`, and `missing` or `error` if not.
+        """
+        raise NotImplementedError
+
+    def get_url(self) -> str:
+        raise NotImplementedError
+
+    def get_cookies(self, urls: list[str]) -> list[dict]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SeleniumTransport(Transport):
+    # The messager launches, swaps and quits the webdriver itself, so closing
+    # the transport leaves it running
+    def __init__(self, webdriver, config):
+        self.webdriver = webdriver
+        self.config = config
+
+    def navigate(self, url: str):
+        self.webdriver.get(url)
+
+    def wait_for(self, xpath: str, visible: bool, timeout: float) -> bool:
+        return self.webdriver.execute_async_script(
+            WAIT_FOR_ELEMENT_SCRIPT, xpath, visible, timeout * 1000)
+
+    def click(self, xpath: str):
+        element = self.webdriver.find_element(By.XPATH, xpath)
+        ActionChains(self.webdriver).move_to_element(element).perform()
+        element.click()
+
+    def get_attribute(self, xpath: str, name: str) -> str | None:
+        return self.webdriver.find_element(By.XPATH, xpath).get_attribute(
+            name)
+
+    def fill_and_send(self, subject: str, message: str,
+                      timeout: float) -> dict:
+        return self.webdriver.execute_async_script(
+            FILL_AND_SEND_SCRIPT, subject, message, timeout * 1000)
+
+    def get_url(self) -> str:
+        return self.webdriver.current_url
+
+    def get_cookies(self, urls: list[str]) -> list[dict]:
+        return self.webdriver.execute_cdp_cmd(
+            "Network.getCookies", {"urls": urls})["cookies"]
+
+
+class FakeBrowser:
+    """Stands in for Chrome on the fake backend, handing out FakeTransports.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def open_tab(self) -> "FakeTransport":
+        return FakeTransport(self.config)
+
+    def close(self):
+        pass
+
+
+class FakeTransport(Transport):
+    """Finds every element straight away and sends nothing. Each send takes
+    `fake_latency` seconds and fails `fake_fail_rate` of the time.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.url = "about:blank"
+
+    def navigate(self, url: str):
+        self.url = url
+
+    def wait_for(self, xpath: str, visible: bool, timeout: float) -> bool:
+        return True
+
+    def click(self, xpath: str):
+        pass
+
+    def get_attribute(self, xpath: str, name: str) -> str | None:
+        return None
+
+    def fill_and_send(self, subject: str, message: str,
+                      timeout: float) -> dict:
+        if self.config.fake_latency > 0:
+            time.sleep(self.config.fake_latency)
+        if random.random() < self.config.fake_fail_rate:
+            return {"ok": False, "error": "Fake failure"}
+        return {"ok": True}
+
+    def get_url(self) -> str:
+        return self.url
+
+    def get_cookies(self, urls: list[str]) -> list[dict]:
+        return []
+
+
+class RecordBrowser(FakeBrowser):
+    """Stands in for Chrome on the record backend. Every tab writes the
+    messages it would have sent to `record_file`, one JSON object a line.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.lock = threading.Lock()
+        self.file = open(config.record_file, "a", encoding="utf-8")
+        logging.info(f"Recording messages to {config.record_file}")
+
+    def open_tab(self) -> "RecordTransport":
+        return RecordTransport(self.config, self)
+
+    def write(self, record: dict):
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class RecordTransport(FakeTransport):
+    def __init__(self, config, browser: RecordBrowser):
+        super().__init__(config)
+        self.browser = browser
+
+    def fill_and_send(self, subject: str, message: str,
+                      timeout: float) -> dict:
+        result = super().fill_and_send(subject, message, timeout)
+        if result["ok"]:
+            self.browser.write({
+                "url": self.url,
+                "subject": subject,
+                "message": message
+            })
+        return result
@@ -1,9 +1,23 @@
 class Student:
-    def __init__(self, student_id, data):
+    """One row of the student CSV.
+
+    The row's values live in the roster's column arrays; a student only keeps
+    its id and where its row is, so there is no per-row dict to store.
+    """
+    __slots__ = ("student_id", "columns", "row")
+
+    def __init__(self, student_id, columns: dict[str, tuple], row: int):
         self.student_id = student_id
-        self.data = data
+        self.columns = columns
+        self.row = row
+
+    @property
+    def data(self) -> dict:
+        return {
+            name: values[self.row] for name, values in self.columns.items()
+        }
 
     def get_student_data(self, var_name):
-        if var_name not in self.data:
+        if var_name not in self.columns:
             return None
-        return self.data[var_name]
+        return self.columns[var_name][self.row]
@@ -1,9 +1,43 @@
 import json
 import logging
 import os
+import shutil
+import tempfile
 
 from colorama import Fore, Style
 
+from src.histogram import histogram_percentile
+from src.journal import get_journal_path, read_journal
+
+STATS_FILE = "stats.json"
+
+
+# Lock files and caches Chrome rebuilds itself; copying them only slows the
+# clone down or stops the cloned profile from launching
+PROFILE_IGNORE = shutil.ignore_patterns(
+    "Singleton*",
+    "lockfile",
+    "*.lock",
+    "Cache",
+    "Code Cache",
+    "GPUCache",
+    "ShaderCache",
+    "GrShaderCache",
+    "Crashpad"
+)
+
+
+def clone_chrome_data_dir(chrome_data_dir: str) -> str:
+    clone_dir = tempfile.mkdtemp(prefix="handshake-profile-")
+    shutil.copytree(
+        os.path.expandvars(chrome_data_dir),
+        clone_dir,
+        ignore=PROFILE_IGNORE,
+        dirs_exist_ok=True
+    )
+    logging.debug(f"Cloned {chrome_data_dir} to {clone_dir}")
+    return clone_dir
+
 
 def time_str_to_seconds(time_str: str):
     try:
@@ -32,58 +66,186 @@ def time_seconds_to_str(time_seconds: int):
             f"{round(time_seconds % (60 * 60) % 60, 2)}s"
 
 
-def create_stats_file():
-    if not os.path.exists("stats.json"):
+# Turns "i/N" into (i, N), the i-th of N shards counting from 1
+def parse_shard(shard: str) -> tuple[int, int]:
+    try:
+        index, count = (int(part) for part in shard.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {shard}, expected i/N like 1/3")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {shard}, i must be from 1 to N")
+    return index, count
+
+
+# Stats of one shard when the students are split between several computers
+def get_shard_stats_file(shard: tuple[int, int]):
+    return f"stats_shard_{shard[0]}_of_{shard[1]}.json"
+
+
+def create_stats_file(path: str = STATS_FILE):
+    if not os.path.exists(path):
         print(
             f"{Fore.CYAN}Stats file "
-            f"({Fore.BLUE}stats.json{Fore.CYAN}) not found..."
+            f"({Fore.BLUE}{path}{Fore.CYAN}) not found..."
             f"\n{Fore.CYAN}Creating stats file...{Style.RESET_ALL}"
         )
-        update_stats(0, 0, 0, 0, 0, 0, 0)
+        update_stats(0, 0, 0, 0, 0, 0, 0, path)
     else:
         print(
             f"{Fore.CYAN}Stats file "
-            f"({Fore.BLUE}stats.json{Fore.CYAN}) already exists!"
+            f"({Fore.BLUE}{path}{Fore.CYAN}) already exists!"
         )
 
 
-def get_stats():
-    time_running = 0
-    messages_sent = 0
-    messages_failed = 0
-    times_failed = 0
-    time_sending = 0
-    time_retrying = 0
-    current_position = 0
-    if not os.path.exists("stats.json"):
-        create_stats_file()
+def get_stats(path: str = STATS_FILE):
+    if not os.path.exists(path):
+        create_stats_file(path)
     print(Fore.CYAN + "Loading stats file..." + Style.RESET_ALL)
-
-    with open("stats.json", "r") as f:
-        stats = json.loads(f.read())
-        time_running = stats["time_running"]
-        messages_sent = stats["messages_sent"]
-        messages_failed = stats["messages_failed"]
-        times_failed = stats["times_failed"]
-        time_sending = stats["time_sending"]
-        time_retrying = stats["time_retrying"],
-        current_position = stats["current_position"]
-        f.close()
+    stats = load_stats_file(path)
     print(Fore.CYAN + "Stats loaded from " +
-          Fore.BLUE + "stats.json" + Style.RESET_ALL)
+          Fore.BLUE + path + Style.RESET_ALL)
+    return get_stats_totals(stats)
+
+
+def get_stats_totals(stats: dict):
+    time_running = stats["time_running"]
+    messages_sent = stats["messages_sent"]
+    messages_failed = stats["messages_failed"]
+    times_failed = stats["times_failed"]
+    time_sending = stats["time_sending"]
+    time_retrying = stats["time_retrying"]
+    current_position = stats["current_position"]
     return (
-        time_running,
+        float(time_running),
         messages_sent,
         messages_failed,
         times_failed,
-        time_sending,
-        time_retrying,
+        float(time_sending),
+        float(time_retrying),
         current_position
     )
 
 
+# Sections of stats.json kept alongside the totals get_stats returns
+def new_stats_sections():
+    return {
+        "recycle_reasons": {},
+        "webdriver_resets": {
+            "count": 0,
+            "stall_time": 0.0,
+            "max_stall": 0.0,
+        },
+        "send_paths": {
+            "direct": {"count": 0, "time": 0.0},
+            "click": {"count": 0, "time": 0.0},
+            "http": {"count": 0, "time": 0.0},
+            "fallbacks": 0,
+            "http_fallbacks": 0,
+        },
+        "waits": {},
+        "page_loads": {},
+        "phases": {},
+        "failures": {},
+        # Send time that overlapped another pool worker's send, so it is
+        # counted more than once in time_sending and time_retrying
+        "pool": {"overlap_time": 0.0},
+    }
+
+
+# Adds the counters in `part` into `total`. Keys starting with max_ keep the
+# larger value instead
+def merge_stats_sections(total: dict, part: dict):
+    for key, value in part.items():
+        if isinstance(value, dict):
+            merge_stats_sections(total.setdefault(key, {}), value)
+        elif key.startswith("max_"):
+            total[key] = max(total.get(key, 0), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+# The changes that turn `old` into `new` when merged with
+# merge_stats_sections
+def diff_stats_sections(new: dict, old: dict):
+    delta = {}
+    for key, value in new.items():
+        if isinstance(value, dict):
+            part = diff_stats_sections(value, old.get(key, {}))
+            if len(part) > 0:
+                delta[key] = part
+        elif key.startswith("max_"):
+            if value != old.get(key):
+                delta[key] = value
+        elif value != old.get(key, 0):
+            delta[key] = value - old.get(key, 0)
+    return delta
+
+
+# The stats file with every journal record written after it applied
+def load_stats_file(path: str = STATS_FILE):
+    stats = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            stats = json.loads(f.read())
+    for record in read_journal(get_journal_path(path)):
+        if record["seq"] <= stats.get("journal_seq", 0):
+            continue
+        merge_stats_sections(stats, record["delta"])
+        stats["current_position"] = record["current_position"]
+        stats["time_running"] = record["time_running"]
+        stats["journal_seq"] = record["seq"]
+    return stats
+
+
+# Writes to a temporary file and moves it over the stats file, so the stats
+# file is never left half written
+def write_stats_file(stats: dict, path: str = STATS_FILE):
+    with open(f"{path}.tmp", "w") as f:
+        f.write(json.dumps(stats, indent=4))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+
+
+# Combines the stats files of several shards into one set of stats. Times
+# are added up, so they count the time spent by every shard
+def merge_stats_files(paths: list[str]):
+    merged = {
+        "time_running": 0.0,
+        "messages_sent": 0,
+        "messages_failed": 0,
+        "times_failed": 0,
+        "time_sending": 0.0,
+        "time_retrying": 0.0,
+        **new_stats_sections(),
+    }
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Could not find stats file {path}")
+        stats = load_stats_file(path)
+        # Positions are rows of each shard's own pass over the csv
+        stats.pop("current_position", None)
+        stats.pop("journal_seq", None)
+        merge_stats_sections(merged, stats)
+    merged["current_position"] = 0
+    return merged
+
+
+def get_stats_sections(path: str = STATS_FILE, stats: dict | None = None):
+    sections = new_stats_sections()
+    if stats is None:
+        if not os.path.exists(path):
+            return sections
+        stats = load_stats_file(path)
+    for name in sections:
+        merge_stats_sections(sections[name], stats.get(name, {}))
+    return sections
+
+
 def update_stats(time_running, messages_sent, messages_failed, times_failed,
-                 time_sending, time_retrying, current_position):
+                 time_sending, time_retrying, current_position,
+                 path: str = STATS_FILE):
     stats = {
         "time_running": time_running,
         "messages_sent": messages_sent,
@@ -93,14 +255,12 @@ def update_stats(time_running, messages_sent, messages_failed, times_failed,
         "time_retrying": time_retrying,
         "current_position": current_position,
     }
-    with open("stats.json", "w") as f:
-        f.write(json.dumps(stats, indent=4))
-        f.close()
+    write_stats_file(stats, path)
 
 
-def backup_stats():
+def backup_stats(path: str = STATS_FILE):
     (time_running, messages_sent, messages_failed, times_failed, time_sending,
-     time_retrying, current_position) = get_stats()
+     time_retrying, current_position) = get_stats(path)
     with open(f"stats_backup_{current_position}.json", "w") as f:
         f.write(json.dumps({
             "time_running": time_running,
@@ -116,22 +276,30 @@ def backup_stats():
           f"{Fore.BLUE}stats_backup_{current_position}.json{Style.RESET_ALL}")
 
 
-def get_stats_message():
-    from src.config import Config
+# Builds the report from a stats file, or from already loaded stats such as
+# merged shard stats. `show_limits` is off for merged stats, since each shard
+# has its own max_time and max_messages to count down from
+def get_stats_message(path: str = STATS_FILE, stats: dict | None = None,
+                      show_limits: bool = True):
+    if stats is None:
+        if not os.path.exists(path):
+            create_stats_file(path)
+        stats = load_stats_file(path)
     (time_running, messages_sent, messages_failed,
-     times_failed, time_sending, time_retrying) = get_stats()
-    config = Config()
-    config.load_config()
+     times_failed, time_sending, time_retrying, _) = get_stats_totals(stats)
+    sections = get_stats_sections(stats=stats)
+    max_time, max_messages = get_report_limits() if show_limits else (-1, -1)
 
     time_waited = (
         time_running - time_sending-time_retrying
+        + sections["pool"]["overlap_time"]
     )
     avg_send_time = time_sending / messages_sent \
         if messages_sent > 0 else 0
     avg_wait_time = (
         (time_waited) /
         (messages_sent + messages_failed)
-    )
+    ) if messages_sent + messages_failed > 0 else 0
     avg_retry_time = time_retrying / times_failed \
         if times_failed > 0 else 0
     success_rate = messages_sent / (
@@ -155,19 +323,50 @@ def get_stats_message():
                                      avg_send_time, success_rate)
     failed_stats = get_failed_statistics(
         header_color, stat_color, value_color, bullet, messages_failed,
-        times_failed, time_retrying, avg_retry_time
+        times_failed, time_retrying, avg_retry_time, sections["failures"]
     )
     other_stats = get_other_statistics(
         header_color, stat_color, value_color, bullet, time_waited,
-        avg_wait_time, config.max_time, config.max_messages, time_running,
-        messages_sent
+        avg_wait_time, max_time, max_messages, time_running,
+        messages_sent, sections["recycle_reasons"],
+        sections["webdriver_resets"]
+    )
+    path_stats = get_send_path_statistics(
+        header_color, stat_color, value_color, bullet, sections["send_paths"]
+    )
+    wait_stats = get_histogram_statistics(
+        "Wait Statistics", header_color, stat_color, value_color, bullet,
+        sections["waits"]
+    )
+    page_load_stats = get_histogram_statistics(
+        "Page Load Statistics", header_color, stat_color, value_color, bullet,
+        sections["page_loads"]
+    )
+    phase_stats = get_histogram_statistics(
+        "Send Phase Statistics", header_color, stat_color, value_color,
+        bullet, sections["phases"]
     )
     return (
         f"{br}{header}{br}{sent_stats}{br}"
-        f"{failed_stats}{br}{other_stats}{br}"
+        f"{failed_stats}{br}{path_stats}{br}{phase_stats}{br}{wait_stats}"
+        f"{br}{page_load_stats}{br}{other_stats}{br}"
     )
 
 
+# The only config values the report needs, read straight from config.json so
+# printing stats does not load and validate the whole config
+def get_report_limits():
+    config = {}
+    if os.path.exists("config.json"):
+        with open("config.json", "r") as f:
+            config = json.loads(f.read())
+    if "max_time" not in config or "max_messages" not in config:
+        from src.config import DEFAULT_CONFIG
+        config = {**DEFAULT_CONFIG, **config}
+    max_time = time_str_to_seconds(str(config["max_time"]))
+    return (-1 if max_time is None else max_time), config["max_messages"]
+
+
 def get_sent_statistics(
     header_color: Fore,
     stat_color: Fore,
@@ -199,8 +398,14 @@ def get_failed_statistics(
     messages_failed: int,
     times_failed: int,
     time_retrying: float,
-    avg_retry_time: float
+    avg_retry_time: float,
+    failures: dict[str, int]
 ):
+    failure_lines = "".join(
+        f"\n{bullet}{stat_color}{failure.replace('_', ' ').title()}: "
+        f"{value_color}{count}"
+        for failure, count in failures.items()
+    )
     return (
         f"{Fore.LIGHTBLACK_EX}───{header_color} Failed Message Statistics:"
         f"\n{bullet}{stat_color}Messages Failed: "
@@ -210,7 +415,65 @@ def get_failed_statistics(
         f"\n{bullet}{stat_color}Time Spent Retrying: "
         f"{value_color}{time_seconds_to_str(time_retrying)}"
         f"\n{bullet}{stat_color}Average Time to Retry: "
-        f"{value_color}{time_seconds_to_str(avg_retry_time)}{Style.RESET_ALL}"
+        f"{value_color}{time_seconds_to_str(avg_retry_time)}"
+        f"{failure_lines}{Style.RESET_ALL}"
+    )
+
+
+def get_send_path_statistics(
+    header_color: Fore,
+    stat_color: Fore,
+    value_color: Fore,
+    bullet: str,
+    send_paths: dict
+):
+    path_lines = ""
+    # Http sends skip the message window, so their time is the whole send
+    paths = (("direct", "Direct Compose", "open"),
+             ("click", "Profile Page", "open"),
+             ("http", "HTTP", "send"))
+    for path, name, action in paths:
+        count = send_paths[path]["count"]
+        avg_time = send_paths[path]["time"] / count if count > 0 else 0
+        path_lines += (
+            f"\n{bullet}{stat_color}{name}: "
+            f"{value_color}{count} "
+            f"(avg {time_seconds_to_str(avg_time)} to {action})"
+        )
+    return (
+        f"{Fore.LIGHTBLACK_EX}───{header_color} Message Modal Statistics:"
+        f"{path_lines}"
+        f"\n{bullet}{stat_color}Direct Compose Fallbacks: "
+        f"{value_color}{send_paths['fallbacks']}"
+        f"\n{bullet}{stat_color}HTTP Fallbacks: "
+        f"{value_color}{send_paths['http_fallbacks']}{Style.RESET_ALL}"
+    )
+
+
+def get_histogram_statistics(
+    title: str,
+    header_color: Fore,
+    stat_color: Fore,
+    value_color: Fore,
+    bullet: str,
+    histograms: dict
+):
+    histogram_lines = ""
+    for name, histogram in histograms.items():
+        p50 = histogram_percentile(histogram, 50)
+        p95 = histogram_percentile(histogram, 95)
+        p99 = histogram_percentile(histogram, 99)
+        histogram_lines += (
+            f"\n{bullet}{stat_color}{name.replace('_', ' ').title()}: "
+            f"{value_color}p50 {time_seconds_to_str(p50)}, "
+            f"p95 {time_seconds_to_str(p95)}, "
+            f"p99 {time_seconds_to_str(p99)}, "
+            f"max {time_seconds_to_str(histogram['max_time'])} "
+            f"({histogram['count']} total)"
+        )
+    return (
+        f"{Fore.LIGHTBLACK_EX}───{header_color} {title}:"
+        f"{histogram_lines}{Style.RESET_ALL}"
     )
 
 
@@ -224,10 +487,19 @@ def get_other_statistics(
     max_time: int,
     max_messages: int,
     time_running: float,
-    messages_sent: int
+    messages_sent: int,
+    recycle_reasons: dict[str, int],
+    webdriver_resets: dict[str, float]
 ):
     remaining_time_val = ""
     remaining_messages_val = ""
+    recycles = ", ".join(
+        f"{reason}: {count}" for reason, count in recycle_reasons.items()
+    )
+    resets = webdriver_resets["count"]
+    avg_reset_stall = webdriver_resets["stall_time"] / resets \
+        if resets > 0 else 0
+    max_reset_stall = webdriver_resets["max_stall"]
     if max_time != -1:
         remaining_time = time_seconds_to_str(max_time - time_running)
         remaining_time_val = (
@@ -247,6 +519,12 @@ def get_other_statistics(
         f"{value_color}{time_seconds_to_str(time_waited)}"
         f"\n{bullet}{stat_color}Average Wait Time: "
         f"{value_color}{time_seconds_to_str(avg_wait_time)}{Style.RESET_ALL}"
+        f"\n{bullet}{stat_color}Webdriver Recycles: "
+        f"{value_color}{sum(recycle_reasons.values())}"
+        f"{f' ({recycles})' if recycles else ''}{Style.RESET_ALL}"
+        f"\n{bullet}{stat_color}Average Recycle Stall: "
+        f"{value_color}{time_seconds_to_str(avg_reset_stall)} "
+        f"(max {time_seconds_to_str(max_reset_stall)}){Style.RESET_ALL}"
         f"{remaining_time_val}"
         f"{remaining_messages_val}"
     )
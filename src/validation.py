@@ -0,0 +1,115 @@
+import logging
+
+CHUNK_SIZE = 100_000
+# Largest Handshake id, as a number of digits
+MAX_ID_DIGITS = 8
+
+
+class RosterReport:
+    """What a validation pass found wrong with the students csv."""
+
+    def __init__(self):
+        self.rows = 0
+        # Entries in the same format as Config.add_modified
+        self.modified = []
+        # Rows the run should skip without building students for them
+        self.skip_rows = set()
+
+    def add(self, rows, student_ids, type: str, action: str, **extra):
+        for row, student_id in zip(rows, student_ids):
+            self.modified.append({
+                "handshake_id": student_id,
+                "row_index": int(row),
+                "type": type,
+                "action": action,
+                **extra
+            })
+            if action == "skip":
+                self.skip_rows.add(int(row))
+
+    def summary(self) -> dict[str, int]:
+        counts = {}
+        for entry in self.modified:
+            key = entry["type"]
+            if "column" in entry:
+                key = f"{key} ({entry['column']})"
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+def validate_roster(path: str, variables: list[str],
+                    chunk_size: int = CHUNK_SIZE) -> RosterReport:
+    """Check every row of the students csv before sending starts.
+
+    Applies the same rules as Config.verify_student_id to whole columns at
+    once, and also finds repeated ids and rows where a variable the message
+    uses is blank. Only the id column and those variables are read, a chunk
+    at a time.
+    """
+    import pandas as pd
+
+    report = RosterReport()
+    columns = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    used_columns = [
+        column for column in ["handshake_id", *variables] if column in columns
+    ]
+    ids_by_row = []
+    chunks = pd.read_csv(
+        path,
+        usecols=used_columns,
+        dtype=str,
+        keep_default_na=False,
+        # Roster's csv reader counts blank lines as rows, so they are kept
+        # here too to keep row numbers the same
+        skip_blank_lines=False,
+        encoding="utf-8-sig",
+        chunksize=chunk_size
+    )
+    for chunk in chunks:
+        chunk = chunk.fillna("")
+        report.rows += len(chunk)
+        if "handshake_id" in chunk:
+            raw_ids = chunk["handshake_id"].str.strip()
+        else:
+            raw_ids = pd.Series("", index=chunk.index)
+
+        missing = raw_ids == ""
+        digits = raw_ids.str.removeprefix("-")
+        not_int = ~missing & ~digits.str.isdigit()
+        valid = ~missing & ~not_int
+        # Compare digit counts so huge ids cannot overflow when converted
+        too_big = valid & (digits.str.lstrip("0").str.len() > MAX_ID_DIGITS)
+        usable = valid & ~too_big
+        negative = usable & raw_ids.str.startswith("-")
+        ids = digits[usable].astype("int64")
+
+        report.add(missing[missing].index, [None] * missing.sum(),
+                   "none", "skip")
+        report.add(not_int[not_int].index, raw_ids[not_int], "not_int",
+                   "skip")
+        report.add(negative[negative].index, -ids[negative[usable]],
+                   "negative", "abs")
+        report.add(too_big[too_big].index,
+                   [int(value) for value in digits[too_big]],
+                   "too_big", "skip")
+        for variable in variables:
+            if variable not in chunk:
+                continue
+            blank = usable & (chunk[variable].str.strip() == "")
+            report.add(blank[blank].index, ids[blank[usable]],
+                       "empty_variable", "blank", column=variable)
+        ids_by_row.append(ids)
+
+    if len(ids_by_row) > 0:
+        ids = pd.concat(ids_by_row)
+        duplicate = ids.duplicated(keep="first")
+        report.add(ids[duplicate].index, ids[duplicate], "duplicate", "skip")
+
+    report.modified.sort(key=lambda entry: entry["row_index"])
+    for entry in report.modified:
+        if entry["handshake_id"] is not None and \
+                entry["type"] != "not_int":
+            entry["handshake_id"] = int(entry["handshake_id"])
+    logging.info(f"Validated {report.rows} rows of {path}: "
+                 f"{report.summary()}")
+    return report
@@ -1,3 +1,34 @@
-from src.utils import get_stats_message
+import argparse
 
-print(get_stats_message())
+from src.utils import STATS_FILE, get_shard_stats_file, get_stats_message, \
+    merge_stats_files, parse_shard, write_stats_file
+
+parser = argparse.ArgumentParser(description="Print the stats of past runs")
+group = parser.add_mutually_exclusive_group()
+group.add_argument("--shard", metavar="i/N",
+                   help="print the stats of one shard")
+group.add_argument("--merge", metavar="FILE", nargs="+",
+                   help="combine the stats files of several shards into one "
+                        "report")
+parser.add_argument("--output", metavar="FILE",
+                    help="also save the merged stats to this file")
+args = parser.parse_args()
+if args.output is not None and args.merge is None:
+    parser.error("--output can only be used with --merge")
+
+if args.merge is not None:
+    try:
+        merged = merge_stats_files(args.merge)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if args.output is not None:
+        write_stats_file(merged, args.output)
+    print(get_stats_message(stats=merged, show_limits=False))
+elif args.shard is not None:
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    print(get_stats_message(get_shard_stats_file(shard)))
+else:
+    print(get_stats_message(STATS_FILE))